@@ -0,0 +1,81 @@
+/*
+  Publication search over the index written by
+  `scripts/update_ads_pubs.py --search-index` (assets/search/).
+  meta.json lists the term shards; a query only fetches the shards of its
+  terms' keys (first characters, dots dropped) and the doc blocks of the
+  hits it shows. Docs are [title, authors, year, venue, url]; doc ids are
+  newest first. The index is generated at build time, not committed.
+*/
+(function () {
+  'use strict';
+
+  function PubSearch(base) {
+    this.base = base.replace(/\/$/, '');
+    this.files = {};
+    this.meta = this.load('meta.json');
+  }
+
+  PubSearch.prototype.load = function (path) {
+    if (!this.files[path]) {
+      this.files[path] = fetch(this.base + '/' + path).then(function (response) {
+        if (!response.ok) throw new Error(path + ': ' + response.status);
+        return response.json();
+      });
+    }
+    return this.files[path];
+  };
+
+  // Same folding as norm() + search_tokens() in update_ads_pubs.py.
+  PubSearch.prototype.tokens = function (meta, query) {
+    var folded = query.normalize('NFD').replace(/\p{Mn}/gu, '').toLowerCase();
+    return (folded.match(/[a-z0-9]+(?:\.[0-9]+)?/g) || []).filter(function (token) {
+      return token.length >= meta.prefix && meta.stopwords.indexOf(token) === -1;
+    });
+  };
+
+  // Ids of docs with a term starting with every token, newest first.
+  PubSearch.prototype.ids = function (meta, tokens) {
+    var self = this;
+    return Promise.all(tokens.map(function (token) {
+      var key = token.replace(/\./g, '').slice(0, meta.prefix);   // search_shard_key()
+      if (meta.shards.indexOf(key) === -1) return [];
+      return self.load('terms/' + key + '.json').then(function (terms) {
+        var hits = {};
+        Object.keys(terms).forEach(function (term) {
+          if (term.lastIndexOf(token, 0) === 0) {
+            terms[term].forEach(function (id) { hits[id] = true; });
+          }
+        });
+        return Object.keys(hits).map(Number);
+      });
+    })).then(function (lists) {
+      var ids = lists.shift() || [];
+      lists.forEach(function (list) {
+        var keep = {};
+        list.forEach(function (id) { keep[id] = true; });
+        ids = ids.filter(function (id) { return keep[id]; });
+      });
+      return ids.sort(function (a, b) { return a - b; });
+    });
+  };
+
+  // Resolves to {total, docs} with at most limit docs.
+  PubSearch.prototype.search = function (query, limit) {
+    var self = this;
+    return this.meta.then(function (meta) {
+      var tokens = self.tokens(meta, query);
+      if (!tokens.length) return { total: 0, docs: [] };
+      return self.ids(meta, tokens).then(function (ids) {
+        return Promise.all(ids.slice(0, limit).map(function (id) {
+          return self.load('docs/' + Math.floor(id / meta.block) + '.json').then(function (block) {
+            return block[id % meta.block];
+          });
+        })).then(function (docs) {
+          return { total: ids.length, docs: docs };
+        });
+      });
+    });
+  };
+
+  window.PubSearch = PubSearch;
+})();
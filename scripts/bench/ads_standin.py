@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# Local stand-in for the ADS API endpoints used by update_ads_pubs.py.
+# RUN IN TERMINAL AS:
+# $./scripts/bench/ads_standin.py --papers 1000 --latency 0.05
+# $ADS_API_URL=http://127.0.0.1:8787/v1 ADS_DEV_KEY=dummy ./scripts/update_ads_pubs.py BENCH /tmp/papers.yml --no-cache
+#
+import sys, re, json, time, random, threading, argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from typing import Dict, List
+
+LIBRARY_NAME = "BENCH"
+LIBRARY_ID = "bench-library"
+MONTHS = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+JOURNALS = ["The Astrophysical Journal", "Astronomy and Astrophysics",
+            "Monthly Notices of the Royal Astronomical Society", "The Astronomical Journal"]
+TITLE_WORDS = ["binary", "massive", "stars", "SDSS-V", "spectroscopic", "Algol", "survey",
+               "B-type binaries", "BLOeM", "rotation", "companions", "evolution", "Sloan"]
+
+
+def synthetic_library(n: int, mega_every: int = 50, mega_authors: int = 1000, seed: int = 1) -> Dict[str, Dict]:
+    """
+    n ADS-shaped records keyed by bibcode. Every mega_every-th paper is a
+    collaboration paper with mega_authors authors; one in five is an arXiv
+    preprint; one in ten has no month in its pubdate.
+    """
+    rng = random.Random(seed)
+    docs = {}
+    for i in range(n):
+        year = 2005 + i % 21
+        month = 0 if i % 10 == 9 else 1 + i % 12
+        arxiv = i % 5 == 0
+        arxiv_id = f"{year % 100:02d}{max(month, 1):02d}.{i:05d}"
+        initial = chr(65 + i % 26)
+        if arxiv:
+            bibcode = f"{year}arXiv{arxiv_id[:4]}{i:05d}{initial}"
+            pub = "arXiv e-prints"
+        else:
+            bibcode = f"{year}ApJ..{100 + i // 100000:.>4}{i % 100000:.>5}{initial}"
+            pub = rng.choice(JOURNALS)
+        n_cites = rng.randint(0, 200)
+        n_auth = mega_authors if mega_every and i % mega_every == 0 else rng.randint(2, 30)
+        authors = [f"Author{i}x{j}, {chr(65 + j % 26)}. {chr(65 + (j * 7) % 26)}." for j in range(n_auth)]
+        authors.insert(rng.randrange(n_auth), "Villaseñor, Jaime I.")
+        docs[bibcode] = {
+            "bibcode": bibcode,
+            "title": [" ".join(rng.sample(TITLE_WORDS, 6)) + f" {i}"],
+            "author": authors,
+            "year": str(year),
+            "pub": pub,
+            "volume": str(100 + i % 900),
+            "page": [str(i)],
+            "doi": [f"10.5555/bench.{i}"],
+            "identifier": [f"arXiv:{arxiv_id}", f"https://doi.org/10.5555/bench.{i}"],
+            "citation_count": n_cites,
+            "citation": [f"{rng.randint(year, 2025)}MNRAS{k:014d}" for k in range(n_cites)],
+            "pubdate": f"{year}-{month:02d}-00",
+            "property": ["ARTICLE"] if arxiv else ["ARTICLE", "REFEREED"],
+        }
+    return docs
+
+
+class StandinADS:
+    """Threaded HTTP server answering /biblib, /search, /export and /metrics from a synthetic library."""
+
+    def __init__(self, papers: int = 100, latency: float = 0.0, rate_limit: int = 5000,
+                 host: str = "127.0.0.1", port: int = 0, mega_every: int = 50):
+        self.docs = synthetic_library(papers, mega_every=mega_every)
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.remaining = rate_limit
+        self.reset = int(time.time()) + 86400
+        self.counts: Dict[str, int] = {}
+        self.bytes_out = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StandinADS":
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_counts(self) -> None:
+        with self.lock:
+            self.counts.clear()
+            self.bytes_out = 0
+
+    # ---- endpoint logic ----
+
+    def select(self, bibcodes: List[str], fl: str) -> List[Dict]:
+        fields = fl.split(",") if fl else ["bibcode"]
+        return [{k: v for k, v in self.docs[b].items() if k in fields} for b in bibcodes if b in self.docs]
+
+    def page(self, docs: List[Dict], q: Dict) -> Dict:
+        start = int(q.get("start", ["0"])[0])
+        rows = int(q.get("rows", ["10"])[0])
+        return {"response": {"numFound": len(docs), "start": start, "docs": docs[start:start + rows]}}
+
+    def metrics(self, bibcodes: List[str]) -> Dict:
+        docs = [self.docs[b] for b in bibcodes if b in self.docs]
+        cites = sorted((d["citation_count"] for d in docs), reverse=True)
+        h = sum(1 for i, c in enumerate(cites, 1) if c >= i)
+        papers, citations, reads = {}, {}, {}
+        for d in docs:
+            papers[d["year"]] = papers.get(d["year"], 0) + 1
+            citations[d["year"]] = citations.get(d["year"], 0) + d["citation_count"]
+            reads[d["year"]] = reads.get(d["year"], 0) + 10 * d["citation_count"]
+        return {
+            "basic stats": {"number of papers": len(docs)},
+            "citation stats": {"total number of citations": sum(cites)},
+            "indicators": {"h": h, "g": h + 3, "i10": sum(1 for c in cites if c >= 10)},
+            "time series": {"h": {y: h for y in papers}, "g": {y: h + 3 for y in papers},
+                            "i10": {}, "read10": {}},
+            "histograms": {"publications": {"all publications": papers},
+                           "citations": {"refereed to refereed": citations},
+                           "reads": {"all reads": reads}},
+        }
+
+    def route(self, method: str, path: str, q: Dict, body: bytes):
+        if path == "biblib/libraries":
+            return 200, {"libraries": [{"name": LIBRARY_NAME, "id": LIBRARY_ID,
+                                        "num_documents": len(self.docs)}]}
+        if path == f"biblib/libraries/{LIBRARY_ID}":
+            codes = list(self.docs)
+            start = int(q.get("start", ["0"])[0])
+            rows = int(q.get("rows", ["20"])[0])
+            return 200, {"documents": codes[start:start + rows],
+                         "metadata": {"name": LIBRARY_NAME, "num_documents": len(codes)}}
+        if path == "search/query":
+            query = q.get("q", [""])[0]
+            if query.startswith("docs(library/"):
+                codes = list(self.docs)
+            else:
+                codes = re.findall(r'bibcode:"([^"]+)"', query)
+            return 200, self.page(self.select(codes, q.get("fl", [""])[0]), q)
+        if path == "search/bigquery" and method == "POST":
+            codes = [c.strip() for c in body.decode("utf-8").splitlines()[1:] if c.strip()]
+            return 200, self.page(self.select(codes, q.get("fl", [""])[0]), q)
+        if path.startswith("export/") and method == "POST":
+            codes = json.loads(body or b"{}").get("bibcode", [])
+            lines = []
+            for c in codes:
+                d = self.docs.get(c)
+                if not d:
+                    continue
+                year, month = d["pubdate"][:4], d["pubdate"][5:7]
+                if path == "export/custom":
+                    lines.append(f"{c} {month}/{year}")
+                elif month != "00":
+                    lines.append(f"@ARTICLE{{{c},\n   year = {year},\n  month = {MONTHS[int(month) - 1]},\n}}\n")
+            return 200, {"msg": f"Retrieved {len(lines)} abstracts", "export": "\n".join(lines) + "\n"}
+        if path == "metrics" and method == "POST":
+            return 200, self.metrics(json.loads(body or b"{}").get("bibcodes", []))
+        return 404, {"error": f"no stand-in for {method} /{path}"}
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _serve(self, method: str):
+                url = urlparse(self.path)
+                path = url.path.split("/v1/", 1)[-1].strip("/")
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if standin.latency:
+                    time.sleep(standin.latency)
+                with standin.lock:
+                    endpoint = path.split("/", 1)[0]
+                    standin.counts[endpoint] = standin.counts.get(endpoint, 0) + 1
+                    standin.remaining -= 1
+                    remaining = standin.remaining
+                if remaining < 0:
+                    status, data = 429, {"error": "Rate limit was exceeded"}
+                else:
+                    status, data = standin.route(method, path, parse_qs(url.query), body)
+                out = json.dumps(data).encode("utf-8")
+                with standin.lock:
+                    standin.bytes_out += len(out)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(out)))
+                self.send_header("X-RateLimit-Limit", str(standin.rate_limit))
+                self.send_header("X-RateLimit-Remaining", str(max(remaining, 0)))
+                self.send_header("X-RateLimit-Reset", str(standin.reset))
+                if status == 429:
+                    self.send_header("Retry-After", "1")
+                self.end_headers()
+                self.wfile.write(out)
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_POST(self):
+                self._serve("POST")
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic ADS library locally.")
+    parser.add_argument("--papers", type=int, default=100, help="Library size (default: 100)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--rate-limit", type=int, default=5000, help="Requests before answering 429")
+    parser.add_argument("--port", type=int, default=8787)
+    args = parser.parse_args()
+
+    standin = StandinADS(args.papers, latency=args.latency, rate_limit=args.rate_limit, port=args.port)
+    print(f"ADS stand-in with {args.papers} papers in library '{LIBRARY_NAME}' at {standin.url}")
+    try:
+        standin.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# Micro-benchmark: author rendering for mega-collaboration papers.
+# RUN IN TERMINAL AS:
+# $./scripts/bench/bench_authors.py
+# $./scripts/bench/bench_authors.py --authors 1000 --papers 200
+#
+import os, sys, time, random, argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import update_ads_pubs as ads
+
+
+def legacy_render(authors, max_authors=8, my_lastnames=ads.MY_LASTNAMES):
+    """The pre-matcher multi-pass rendering, kept here as the reference."""
+    def norm(s):
+        return ads.norm.__wrapped__(s)
+
+    def is_me(name):
+        last = name.split(",")[0] if "," in name else name.split()[-1]
+        return norm(last) in [norm(x) for x in my_lastnames]
+
+    def html(names):
+        return "; ".join(f"<strong>{ads.format_author_display(a)}</strong>" if is_me(a)
+                         else ads.format_author_display(a) for a in names)
+
+    N = max_authors
+    mine_idx = next((i for i, a in enumerate(authors) if is_me(a)), None)
+    show = authors[:N]
+    etal = len(authors) > N
+    if etal and not any(is_me(a) for a in show) and mine_idx is not None:
+        show = authors[:N-1] + [authors[mine_idx]]
+    short = html(show) + (", <em>et&nbsp;al.</em>" if etal else "")
+    return {
+        "authors_html": html(authors),
+        "authors_short_html": short,
+        "authors_display": [ads.format_author_display(a) for a in authors],
+        "me_index": next((i for i, a in enumerate(authors) if is_me(a)), -1),
+        "n_authors": len(authors),
+    }
+
+
+def synthetic_authors(n, rng):
+    firsts = ["Anna", "José", "Li", "Ngozi", "Pierre", "Søren", "Yuki", "Zoë"]
+    lasts = ["García", "Müller", "Smith", "Chen", "Okafor", "Dubois", "Ñúñez", "Kowalski"]
+    authors = [f"{rng.choice(lasts)}{i}, {rng.choice(firsts)} {chr(65 + i % 26)}." for i in range(n)]
+    authors.insert(rng.randrange(n), "Villaseñor, Jaime I.")
+    return authors
+
+
+def timed(fn, papers, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        ads.norm.cache_clear()
+        t0 = time.perf_counter()
+        for authors in papers:
+            fn(authors)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark author rendering on synthetic author lists.")
+    parser.add_argument("--authors", type=int, default=1000, help="Authors per paper (default: 1000)")
+    parser.add_argument("--papers", type=int, default=100, help="Papers per round (default: 100)")
+    parser.add_argument("--repeat", type=int, default=3, help="Rounds; best is reported (default: 3)")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    papers = [synthetic_authors(args.authors, rng) for _ in range(args.papers)]
+    for authors in papers[:5]:
+        assert ads.render_authors(authors) == legacy_render(authors), "renderers disagree"
+
+    old = timed(legacy_render, papers, args.repeat)
+    new = timed(ads.render_authors, papers, args.repeat)
+    print(f"{args.papers} papers x {args.authors + 1} authors")
+    print(f"  legacy multi-pass : {old * 1e3:9.1f} ms")
+    print(f"  render_authors    : {new * 1e3:9.1f} ms  ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# End-to-end benchmark of the ADS sync pipeline against the local stand-in.
+# RUN IN TERMINAL AS:
+# $./scripts/bench/bench_sync.py
+# $./scripts/bench/bench_sync.py --sizes 100 1000 10000 --latency 0.05 --concurrency 8
+# $./scripts/bench/bench_sync.py --sizes 10000 100000 --streaming   # fetch/map/spill overlapped, merged write
+#
+import os, sys, time, tempfile, tracemalloc, argparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+os.environ.setdefault("ADS_DEV_KEY", "bench")
+
+import update_ads_pubs as ads
+from ads_standin import StandinADS, LIBRARY_NAME
+
+STAGES = ["library", "bibcodes", "fetch", "map", "write", "metrics"]
+
+
+def run_once(standin: StandinADS, concurrency: int, outdir: str, streaming: bool = False) -> dict:
+    ads.ADS_API = standin.url
+    ads.CACHE = None
+    ads.CONCURRENCY = concurrency
+    ads.TRANSPORT = ads.AdsTransport(pool_size=concurrency)
+    ads.BIGQUERY_OK = True
+    standin.reset_counts()
+
+    times = {}
+
+    def stage(name, fn, *args):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        times[name] = time.perf_counter() - t0
+        return out
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    lib_id = stage("library", ads.find_library_id, LIBRARY_NAME)
+    bibs = stage("bibcodes", ads.get_bibcodes_for_library, lib_id)
+    if streaming:
+        # mapping and spilling overlap the downloads, so "fetch" covers all three
+        with tempfile.TemporaryDirectory() as workdir:
+            chunks = (ads.map_docs(d, m) for d, m in ads.iter_docs_and_months(bibs))
+            runs, mapped = stage("fetch", ads.spill_sorted_runs, chunks, workdir)
+            times["map"] = 0.0
+            stage("write", lambda: ads.write_publications(os.path.join(outdir, "papers_all.yml"),
+                                                          ads.iter_merged(runs), summary=mapped))
+    else:
+        docs, months = stage("fetch", ads.fetch_docs_and_months, bibs)
+        mapped = stage("map", lambda: ads.sort_mapped(ads.map_docs(docs, months)))
+        stage("write", ads.write_publications, os.path.join(outdir, "papers_all.yml"), mapped)
+    stage("metrics", lambda: ads.build_metrics_payload(ads.fetch_metrics(bibs), mapped))
+    wall = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"papers": len(mapped), "wall": wall, "times": times, "peak": peak,
+            "requests": sum(standin.counts.values()), "counts": dict(standin.counts)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark update_ads_pubs.py against a local ADS stand-in.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--latency", type=float, default=0.02, help="Per-request latency in seconds (default: 0.02)")
+    parser.add_argument("--rate-limit", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=ads.DEFAULT_CONCURRENCY)
+    parser.add_argument("--streaming", action="store_true",
+                        help="Benchmark the streaming pipeline (spilled sorted runs) used by full syncs")
+    parser.add_argument("--mega-every", type=int, default=50, help="Every Nth paper has 1000 authors (default: 50)")
+    args = parser.parse_args()
+
+    header = f"{'papers':>7} {'wall':>8} " + " ".join(f"{s:>9}" for s in STAGES) + f" {'requests':>9} {'peak MB':>8}"
+    print(f"latency {args.latency * 1e3:.0f} ms, concurrency {args.concurrency}"
+          + (", streaming" if args.streaming else ""))
+    print(header)
+    with tempfile.TemporaryDirectory() as outdir:
+        for n in args.sizes:
+            standin = StandinADS(n, latency=args.latency, rate_limit=args.rate_limit,
+                                 mega_every=args.mega_every).start()
+            try:
+                r = run_once(standin, args.concurrency, outdir, streaming=args.streaming)
+            finally:
+                standin.stop()
+            stages = " ".join(f"{r['times'][s]:>8.2f}s" for s in STAGES)
+            print(f"{r['papers']:>7} {r['wall']:>7.2f}s {stages} {r['requests']:>9} {r['peak'] / 2**20:>8.1f}")
+            print(f"{'':>7} requests by endpoint: "
+                  + ", ".join(f"{k} {v}" for k, v in sorted(r["counts"].items())))
+
+
+if __name__ == "__main__":
+    main()
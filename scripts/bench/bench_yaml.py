@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# Benchmark: publications YAML load/dump, pure-Python vs libyaml.
+# RUN IN TERMINAL AS:
+# $./scripts/bench/bench_yaml.py
+# $./scripts/bench/bench_yaml.py --sizes 200 2000
+#
+import os, sys, io, time, argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import yaml
+import update_ads_pubs as ads
+
+SEED_YML = ads.DEFAULT_ALL_YML
+
+
+def synthetic_entries(seed, n):
+    """Repeat the real entries with unique bibcodes until there are n of them."""
+    out = []
+    while len(out) < n:
+        for m in seed:
+            if len(out) == n:
+                break
+            out.append({**m, "bibcode": f"{m['bibcode']}-{len(out)}"})
+    return out
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark YAML load/dump of publication lists.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 2000, 20000])
+    parser.add_argument("--seed", default=SEED_YML, help=f"Publications YAML to replicate (default: {SEED_YML})")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    seed = ads.read_yaml_list(args.seed)
+    if not seed:
+        sys.exit(f"{args.seed} has no entries")
+    print(f"libyaml available: {ads.YAML_DUMPER is not yaml.SafeDumper}")
+    print(f"{'entries':>8} {'dump py':>10} {'dump C':>10} {'stream C':>10} {'load py':>10} {'load C':>10}")
+    for n in args.sizes:
+        items = synthetic_entries(seed, n)
+        text = yaml.dump(items, Dumper=ads.YAML_DUMPER, sort_keys=False, allow_unicode=True)
+        times = [
+            best_of(lambda: yaml.safe_dump(items, sort_keys=False, allow_unicode=True), args.repeat),
+            best_of(lambda: yaml.dump(items, Dumper=ads.YAML_DUMPER, sort_keys=False, allow_unicode=True), args.repeat),
+            best_of(lambda: ads.write_yaml_items(io.StringIO(), items), args.repeat),
+            best_of(lambda: yaml.safe_load(text), args.repeat),
+            best_of(lambda: yaml.load(text, Loader=ads.YAML_LOADER), args.repeat),
+        ]
+        print(f"{n:>8} " + " ".join(f"{t * 1e3:>8.0f}ms" for t in times))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,8 +8,13 @@ cd "$REPO_ROOT"
 
 LIB_NAME="${ADS_LIBRARY:-JIV}"
 ALL_PATH="_data/papers_all.yml"
+VIEWS_PATH="_data/papers_all_views.yml"
+SEARCH_DIR="assets/search"
 METRICS_PATH="_data/ads_metrics.yml"
+HISTORY_DIR=".ads_history"
 CHANGELOG_PATH="CHANGELOG.md"
+MANIFEST_PATH="$(mktemp "${TMPDIR:-/tmp}/ads_manifest.XXXXXX.json")"
+trap 'rm -f "${MANIFEST_PATH}"' EXIT
 DELTA_YEAR="${ADS_DELTA_YEAR:-2026}"
 TODAY="$(date +%F)"
 COMMIT_MSG="${1:-"chore: refresh ADS metrics for ${DELTA_YEAR}"}"
@@ -47,29 +52,48 @@ resolve_push_target() {
 }
 
 echo "Refreshing ADS library '${LIB_NAME}' with delta year ${DELTA_YEAR}..."
-./scripts/update_ads_pubs.py "${LIB_NAME}" "${ALL_PATH}" --metrics "${METRICS_PATH}" --delta-year "${DELTA_YEAR}"
+./scripts/update_ads_pubs.py "${LIB_NAME}" "${ALL_PATH}" --metrics "${METRICS_PATH}" --delta-year "${DELTA_YEAR}" \
+  --search-index "${SEARCH_DIR}" --history-dir "${HISTORY_DIR}" --manifest "${MANIFEST_PATH}"
 
 echo "Verifying metrics snapshot..."
-python3 - "$METRICS_PATH" "$TODAY" "$DELTA_YEAR" <<'PY'
+# Unchanged outputs are left untouched (as_of included), so as_of is only
+# expected to be today when the metrics file was rewritten.
+verify_status=0
+python3 - "$MANIFEST_PATH" "$METRICS_PATH" "$TODAY" "$DELTA_YEAR" <<'PY' || verify_status=$?
+import json
 import sys
 import yaml
 
-path, expected_date, expected_year = sys.argv[1:4]
+manifest_path, path, expected_date, expected_year = sys.argv[1:5]
+with open(manifest_path, "r", encoding="utf-8") as handle:
+    manifest = json.load(handle)
 with open(path, "r", encoding="utf-8") as handle:
     payload = yaml.safe_load(handle) or {}
 
 actual_date = str(payload.get("as_of", ""))
 actual_year = str(payload.get("delta_year", ""))
+metrics_changed = manifest["outputs"].get(path, {}).get("changed", True)
 
-if actual_date != expected_date:
+if metrics_changed and actual_date != expected_date:
     raise SystemExit(f"Expected as_of={expected_date}, found {actual_date}")
 if actual_year != expected_year:
     raise SystemExit(f"Expected delta_year={expected_year}, found {actual_year}")
+
+for out, diff in manifest["publications"].items():
+    print(f"{out}: {len(diff['added'])} added, {len(diff['removed'])} removed, "
+          f"{len(diff['citations'])} citation changes")
+for out, diff in manifest["metrics"].items():
+    for key, (old, new) in diff.items():
+        print(f"{out}: {key} {old} -> {new}")
+
+sys.exit(0 if manifest["changed"] else 3)
 PY
 
-if git diff --quiet -- "${ALL_PATH}" "${METRICS_PATH}"; then
-  echo "No publication or metrics changes detected; nothing to commit."
+if [[ "${verify_status}" -eq 3 ]]; then
+  echo "No publication or metrics changes detected; skipping build and push."
   exit 0
+elif [[ "${verify_status}" -ne 0 ]]; then
+  exit "${verify_status}"
 fi
 
 echo "Recording refresh in ${CHANGELOG_PATH}..."
@@ -99,7 +123,10 @@ echo "Building the site..."
 bundle exec jekyll build
 
 echo "Staging publication refresh..."
-git add "${ALL_PATH}" "${METRICS_PATH}" "${CHANGELOG_PATH}"
+git add "${ALL_PATH}" "${VIEWS_PATH}" "${METRICS_PATH}" "${CHANGELOG_PATH}"
+if [[ -d "${HISTORY_DIR}" ]]; then
+  git add "${HISTORY_DIR}"
+fi
 
 if git diff --cached --quiet; then
   echo "Nothing staged after refresh; nothing to commit."
@@ -4,24 +4,74 @@
 # $./scripts/update_ads_pubs.py "JIV" --metrics --metrics-only
 # $./scripts/update_ads_pubs.py --delta-year 2025 --metrics-only
 # $./scripts/update_ads_pubs.py "JIV" _data/papers_all.yml --sdss _data/papers_sdssv.yml --metrics _data/ads_metrics.yml
+# $./scripts/update_ads_pubs.py --metrics --refresh        # ignore cached ADS responses
 #
-import os, sys, re, time, json, math, unicodedata, html, argparse
-from typing import List, Dict
+import os, sys, re, time, json, math, random, unicodedata, html, argparse, sqlite3, hashlib, threading, tempfile, gzip
+import cProfile, pstats, heapq
+from contextlib import contextmanager, nullcontext, ExitStack
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from functools import lru_cache, wraps
+from itertools import islice
+from typing import List, Dict, Optional, Tuple, Iterable, Iterator
 import requests, yaml
 
-ADS_API = "https://api.adsabs.harvard.edu/v1"
+try:
+    import numpy as np
+except ImportError:  # local metrics fall back to pure Python
+    np = None
+
+ADS_API = os.getenv("ADS_API_URL", "https://api.adsabs.harvard.edu/v1")
 TOKEN = os.getenv("ADS_DEV_KEY")
 HEADERS = {"Authorization": f"Bearer {TOKEN}"}
+# libyaml-backed loader/dumper when PyYAML was built with it
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
 DEFAULT_LIBRARY_NAME = "JIV"
 DEFAULT_ALL_YML = "_data/papers_all.yml"
 DEFAULT_SDSS_YML = "_data/papers_sdssv.yml"
+DEFAULT_SHARDS_DIR = "_data/papers"
+DEFAULT_SEARCH_DIR = "assets/search"
 DEFAULT_METRICS_YML = "_data/ads_metrics.yml"
+DEFAULT_CACHE_DIR = ".ads_cache"
+DEFAULT_RUN_DIR = os.path.join(DEFAULT_CACHE_DIR, "run")
+DEFAULT_HISTORY_DIR = ".ads_history"   # --history-dir; not in .gitignore: meant to be committed
+METRICS_STORE_NAME = "metrics_store.json"
+DEFAULT_TAGS_YML = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ads_tags.yml")
+MY_LASTNAMES = ("Villaseñor", "Villasenor")
+
+# How long (seconds) a cached ADS response stays fresh, per endpoint.
+# Titles/authors/months are effectively static; library contents and
+# citation counts move, so those expire well inside the nightly sync
+# cadence (a run a few minutes short of 24h must not reuse yesterday's
+# citation counts or metrics).
+CACHE_TTLS = {
+    "biblib": 4 * 3600,
+    "search": 4 * 3600,
+    "export": 30 * 86400,
+    "metrics": 4 * 3600,
+}
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_CONCURRENCY = 4
+METADATA_CHUNK = 50           # bibcodes per OR-query (fallback path)
+BIGQUERY_CHUNK = 2000         # bibcodes per /search/bigquery POST
+LIBRARY_PAGE_ROWS = 100        # /biblib/libraries listing page size
+BIBCODE_PAGE_ROWS = 2000       # /biblib/libraries/<id> documents page size
+HTTP_TIMEOUT = (10, 60)        # (connect, read) seconds
+HTTP_RETRIES = 4
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+EXPORT_CHUNK = 500            # bibcodes per /export/custom month lookup
+SPILL_RUN_SIZE = 5000         # mapped papers held in memory before a sorted run is spilled to disk
 
 # Map BibTeX month tokens to two-digit numbers
 BIB_MONTHS = {
     "jan":"01","feb":"02","mar":"03","apr":"04","may":"05","jun":"06",
     "jul":"07","aug":"08","sep":"09","oct":"10","nov":"11","dec":"12"
 }
+MONTH_TOKENS = {num: token for token, num in BIB_MONTHS.items()}
+
+# /export/custom format: one "<bibcode> <mm>/<yyyy>" line per record
+MONTH_EXPORT_FORMAT = "%R %D\n"
 
 
 # ---- helpers ----
@@ -29,6 +79,7 @@ BIB_MONTHS = {
 def die(msg):
     print(f"ERROR: {msg}", file=sys.stderr); sys.exit(1)
 
+@lru_cache(maxsize=65536)
 def norm(s: str) -> str:
     """lowercase, strip accents & extra spaces for robust matching"""
     s = unicodedata.normalize("NFD", s)
@@ -44,37 +95,528 @@ def clean_title(title: str) -> str:
     title = re.sub(r"\s+", " ", title).strip()
     return title
 
+# ---- ADS response cache ----
+
+class ResponseCache:
+    """
+    SQLite-backed cache of decoded ADS JSON responses.
+    Keys are endpoint + normalized params/body; entries expire per CACHE_TTLS
+    and the least recently used ones are evicted once max_bytes is exceeded.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = CACHE_MAX_BYTES, refresh: bool = False):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "responses.sqlite3")
+        self.max_bytes = max_bytes
+        self.refresh = refresh   # skip reads, still store fresh responses
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, endpoint TEXT, body BLOB, size INTEGER,"
+            " created REAL, accessed REAL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+        self.db.commit()
+
+    @staticmethod
+    def endpoint(path: str) -> str:
+        return path.strip("/").split("/", 1)[0]
+
+    @staticmethod
+    def make_key(method: str, path: str, params=None, payload=None) -> str:
+        blob = json.dumps(
+            [method.upper(), path.rstrip("/"), params or {}, payload],
+            sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+        )
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, endpoint: str):
+        if self.refresh:
+            return None
+        now = time.time()
+        with self.lock:
+            row = self.db.execute(
+                "SELECT body, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if not row:
+                return None
+            body, created = row
+            if now - created > CACHE_TTLS.get(endpoint, 0):
+                self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.db.commit()
+                return None
+            self.db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.db.commit()
+        return json.loads(body)
+
+    def put(self, key: str, endpoint: str, data) -> None:
+        if CACHE_TTLS.get(endpoint, 0) <= 0:
+            return
+        body = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, endpoint, body, len(body), now, now),
+            )
+            self._evict()
+            self.db.commit()
+
+    def _evict(self) -> None:
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self.db.execute("SELECT key, size FROM responses ORDER BY accessed ASC").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+CACHE: Optional[ResponseCache] = None  # set in main() for runs that call ADS, unless --no-cache
+
+
+# ---- rate limiting & concurrency ----
+
+class RateLimiter:
+    """
+    Paces requests from the X-RateLimit-Remaining / X-RateLimit-Reset headers
+    ADS returns on every call, instead of sleeping a fixed amount per chunk.
+    ADS quotas are per endpoint (and mostly per day), so each endpoint keeps
+    its own state, keyed like the cache (ResponseCache.endpoint). Plenty of
+    quota left -> no delay; running low -> a short gap between calls, capped
+    at max_delay (spreading the calls evenly over a daily window would mean
+    minutes per request); exhausted -> wait for the reset if it is within
+    max_wait, otherwise go ahead and let the 429 retry/backoff path decide.
+    """
+
+    def __init__(self, reserve: int = 5, low_water: int = 100,
+                 max_delay: float = 2.0, max_wait: float = 60.0):
+        self.reserve = reserve
+        self.low_water = low_water
+        self.max_delay = max_delay
+        self.max_wait = max_wait
+        self.state: Dict[str, List[float]] = {}   # endpoint -> [remaining, reset epoch]
+        self.lock = threading.Lock()
+
+    def update(self, endpoint: str, headers) -> None:
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        if remaining is None:
+            return
+        with self.lock:
+            self.state[endpoint] = [coerce_int(remaining), float(coerce_int(reset))]
+
+    def delay(self, endpoint: str, now: Optional[float] = None) -> float:
+        """Seconds to wait before the next call to endpoint; counts that call against the quota."""
+        with self.lock:
+            st = self.state.get(endpoint)
+            if st is None:
+                return 0.0
+            remaining, reset = st
+            window = max(reset - (time.time() if now is None else now), 0.0)
+            if remaining <= self.reserve:
+                delay = window if window <= self.max_wait else 0.0
+            elif remaining < self.low_water:
+                delay = min(window / remaining, self.max_delay)
+            else:
+                delay = 0.0
+            st[0] = remaining - 1   # optimistic; corrected by the next update()
+        return delay
+
+    def wait(self, endpoint: str) -> None:
+        delay = self.delay(endpoint)
+        if delay > 0:
+            time.sleep(delay)
+
+RATE_LIMIT = RateLimiter()
+CONCURRENCY = DEFAULT_CONCURRENCY  # overridden by --concurrency
+
+
+# ---- HTTP transport ----
+
+class AdsTransport:
+    """
+    Single keep-alive session shared by every ADS call: pooled connections,
+    default timeouts, gzip, exponential backoff with jitter on 429/5xx and
+    connection errors (honouring Retry-After), and per-endpoint counters.
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_CONCURRENCY, retries: int = HTTP_RETRIES,
+                 backoff: float = 1.0, timeout=HTTP_TIMEOUT):
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({**HEADERS, "Accept-Encoding": "gzip, deflate"})
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self.lock = threading.Lock()
+
+    def _count(self, endpoint: str, **inc) -> None:
+        with self.lock:
+            st = self.stats.setdefault(endpoint, {"requests": 0, "bytes": 0, "retries": 0, "errors": 0})
+            for k, v in inc.items():
+                st[k] += v
+
+    def _delay(self, attempt: int, r=None) -> float:
+        retry_after = r.headers.get("Retry-After") if r is not None else None
+        if retry_after:
+            if retry_after.strip().isdigit():
+                return float(retry_after)
+            try:
+                return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0)
+            except (TypeError, ValueError):
+                pass
+        return random.uniform(0, self.backoff * (2 ** attempt))   # full jitter
+
+    def request(self, method: str, path: str, timeout=None, **kwargs) -> requests.Response:
+        endpoint = ResponseCache.endpoint(path)
+        url = f"{ADS_API}/{path}"
+        for attempt in range(self.retries + 1):
+            RATE_LIMIT.wait(endpoint)
+            try:
+                r = self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self._count(endpoint, errors=1)
+                if attempt == self.retries:
+                    raise
+                self._count(endpoint, retries=1)
+                time.sleep(self._delay(attempt))
+                continue
+            RATE_LIMIT.update(endpoint, r.headers)
+            self._count(endpoint, requests=1,
+                        bytes=coerce_int(r.headers.get("Content-Length")) or len(r.content))
+            if r.status_code in RETRY_STATUSES and attempt < self.retries:
+                self._count(endpoint, retries=1)
+                time.sleep(self._delay(attempt, r))
+                continue
+            r.ads_retries = attempt
+            r.raise_for_status()
+            return r
+
+    def summary(self) -> str:
+        parts = [f"{ep} {st['requests']} req/{st['bytes'] / 1024:.1f} kB"
+                 + (f"/{st['retries']} retries" if st["retries"] else "")
+                 for ep, st in sorted(self.stats.items())]
+        return "ADS requests: " + (", ".join(parts) if parts else "none")
+
+TRANSPORT: Optional[AdsTransport] = None  # created lazily / in main()
+
+def transport() -> AdsTransport:
+    global TRANSPORT
+    if TRANSPORT is None:
+        TRANSPORT = AdsTransport(pool_size=CONCURRENCY)
+    return TRANSPORT
+
+def run_chunks(fn, chunks: List) -> List:
+    """Apply fn to every chunk on a bounded thread pool; results keep chunk order."""
+    if len(chunks) <= 1 or CONCURRENCY <= 1:
+        return [fn(c) for c in chunks]
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        return list(pool.map(fn, chunks))
+
+# ---- profiling / tracing ----
+
+class Tracer:
+    """
+    Collects spans for --profile / --trace: one per pipeline stage and one
+    per ADS call (duration, status, bytes, retries, cache hit/miss). Spans
+    can be summarized as a table or written as Chrome-trace JSON, which
+    chrome://tracing and ui.perfetto.dev both open.
+    """
+
+    def __init__(self, cprofile_path: Optional[str] = None):
+        self.t0 = time.perf_counter()
+        self.events: List[Dict] = []
+        self.threads: Dict[int, int] = {}
+        self.lock = threading.Lock()
+        self.cprofile_path = cprofile_path
+        self.profiler = cProfile.Profile() if cprofile_path else None
+
+    def _tid(self) -> int:
+        ident = threading.get_ident()
+        with self.lock:
+            return self.threads.setdefault(ident, len(self.threads) + 1)
+
+    @contextmanager
+    def span(self, name: str, cat: str = "stage", **args):
+        start = time.perf_counter()
+        try:
+            yield args
+        except BaseException as exc:
+            args.setdefault("error", type(exc).__name__)
+            raise
+        finally:
+            event = {"name": name, "cat": cat, "start": start - self.t0,
+                     "dur": time.perf_counter() - start, "tid": self._tid(), "args": args}
+            with self.lock:
+                self.events.append(event)
+
+    @contextmanager
+    def cpu_profile(self):
+        """cProfile the enclosed block (accumulated across calls) when --cprofile is set."""
+        if self.profiler is None:
+            yield
+            return
+        self.profiler.enable()
+        try:
+            yield
+        finally:
+            self.profiler.disable()
+
+    def summary(self) -> str:
+        stages: Dict[str, List[float]] = {}
+        http: Dict[str, Dict[str, float]] = {}
+        for e in sorted(self.events, key=lambda e: e["start"]):
+            if e["cat"] == "stage":
+                st = stages.setdefault(e["name"], [0, 0.0, 0.0])
+                st[0] += 1
+                st[1] += e["dur"]
+                st[2] = max(st[2], e["dur"])
+            else:
+                a = e["args"]
+                st = http.setdefault(a.get("endpoint", "?"),
+                                     {"calls": 0, "hits": 0, "time": 0.0, "bytes": 0, "retries": 0, "errors": 0})
+                st["calls"] += 1
+                st["hits"] += a.get("cache") == "hit"
+                st["time"] += e["dur"]
+                st["bytes"] += a.get("bytes", 0)
+                st["retries"] += a.get("retries", 0)
+                st["errors"] += "error" in a
+        lines = [f"{'stage':<24}{'calls':>6}{'total ms':>11}{'max ms':>10}"]
+        for name, (calls, total, peak) in stages.items():
+            lines.append(f"{name:<24}{calls:>6}{total * 1e3:>11.1f}{peak * 1e3:>10.1f}")
+        lines.append(f"{'endpoint':<12}{'calls':>6}{'cache hits':>11}{'time ms':>10}{'kB':>9}{'retries':>8}{'errors':>7}")
+        for ep, st in sorted(http.items()):
+            lines.append(f"{ep:<12}{st['calls']:>6}{st['hits']:>11}{st['time'] * 1e3:>10.1f}"
+                         f"{st['bytes'] / 1024:>9.1f}{st['retries']:>8}{st['errors']:>7}")
+        lines.append(f"wall time: {(time.perf_counter() - self.t0) * 1e3:.1f} ms")
+        return "\n".join(lines)
+
+    def write_chrome_trace(self, path: str) -> None:
+        events = [{"name": e["name"], "cat": e["cat"], "ph": "X", "pid": 1, "tid": e["tid"],
+                   "ts": round(e["start"] * 1e6), "dur": round(e["dur"] * 1e6), "args": e["args"]}
+                  for e in self.events]
+        events += [{"name": "thread_name", "ph": "M", "pid": 1, "tid": tid,
+                    "args": {"name": "main" if tid == 1 else f"worker-{tid - 1}"}}
+                   for tid in self.threads.values()]
+        with atomic_open(path) as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def write_cprofile(self) -> None:
+        if self.profiler is not None:
+            self.profiler.dump_stats(self.cprofile_path)
+
+TRACER: Optional[Tracer] = None  # set in main() by --profile / --trace / --cprofile
+
+def span(name: str, cat: str = "stage", **args):
+    return TRACER.span(name, cat, **args) if TRACER is not None else nullcontext(args)
+
+def traced(name: str):
+    """Decorator: record every call of the function as a stage span."""
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+# ---- run checkpoints ----
+# Each completed stage/chunk (library bibcodes, metadata chunks, months,
+# metrics) is appended to <run-dir>/<kind>.jsonl as it finishes. A failed run
+# leaves the journal behind and --resume picks it up; a successful run
+# deletes it.
+
+class RunJournal:
+    """
+    Append-only JSONL checkpoints for one sync run. The journal only ever
+    deletes its own marker and *.jsonl stage files, and refuses a non-empty
+    run dir that it did not create.
+    """
+
+    MARKER = ".ads_run_journal"
+
+    def __init__(self, run_dir: str, resume: bool = False):
+        self.run_dir = run_dir
+        self.lock = threading.Lock()
+        self.entries: Dict[str, Dict] = {}
+        os.makedirs(run_dir, exist_ok=True)
+        marker = os.path.join(run_dir, self.MARKER)
+        if os.listdir(run_dir) and not os.path.exists(marker):
+            die(f"{run_dir} is not empty and is not a run journal; pick an empty or new --run-dir.")
+        if not resume:
+            self._clear()
+        with open(marker, "a", encoding="utf-8"):
+            pass
+        for name in sorted(os.listdir(run_dir)):
+            if name.endswith(".jsonl"):
+                self.entries[name[:-6]] = self._load(os.path.join(run_dir, name))
+
+    def _clear(self) -> None:
+        for name in os.listdir(self.run_dir):
+            if name.endswith(".jsonl"):
+                os.unlink(os.path.join(self.run_dir, name))
+
+    @staticmethod
+    def _load(path: str) -> Dict:
+        entries = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.update(json.loads(line))
+                except ValueError:      # torn last line from an interrupted write
+                    break
+        return entries
+
+    def summary(self) -> str:
+        parts = [f"{len(v)} {k}" for k, v in sorted(self.entries.items())]
+        return ", ".join(parts) if parts else "empty"
+
+    def get(self, kind: str, key: str):
+        return self.entries.get(kind, {}).get(key)
+
+    def put_many(self, kind: str, items: Dict) -> None:
+        line = json.dumps(items, separators=(",", ":")) + "\n"
+        with self.lock:
+            self.entries.setdefault(kind, {}).update(items)
+            with open(os.path.join(self.run_dir, f"{kind}.jsonl"), "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def put(self, kind: str, key: str, value) -> None:
+        self.put_many(kind, {key: value})
+
+    def finish(self) -> None:
+        self._clear()
+        os.unlink(os.path.join(self.run_dir, self.MARKER))
+        try:
+            os.rmdir(self.run_dir)      # only if nothing else was left in it
+        except OSError:
+            pass
+
+JOURNAL: Optional[RunJournal] = None  # set in main() by --run-dir / --resume
+
+def checkpointed(kind: str):
+    """Decorator: replay the result of an identical call from JOURNAL, or journal it once it succeeds."""
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if JOURNAL is None:
+                return fn(*args, **kwargs)
+            key = hashlib.sha1(json.dumps([args, kwargs], sort_keys=True).encode("utf-8")).hexdigest()
+            hit = JOURNAL.get(kind, key)
+            if hit is not None:
+                return hit
+            result = fn(*args, **kwargs)
+            JOURNAL.put(kind, key, result)
+            return result
+        return wrapper
+    return deco
+
+def ads_json(method: str, path: str, params=None, payload=None, headers=None, timeout=None, data=None):
+    """
+    Issue one ADS API call and return the decoded JSON body, going through
+    CACHE when enabled. payload is sent as JSON, data as a raw body.
+    Raises requests.HTTPError on non-2xx responses.
+    """
+    endpoint = ResponseCache.endpoint(path)
+    key = ResponseCache.make_key(method, path, params, payload if data is None else data)
+    with span(f"{method} /{path}", cat="http", endpoint=endpoint) as info:
+        if CACHE is not None:
+            hit = CACHE.get(key, endpoint)
+            if hit is not None:
+                info["cache"] = "hit"
+                return hit
+        info["cache"] = "miss" if CACHE is not None else "off"
+        try:
+            r = transport().request(method, path, headers=headers, params=params, json=payload,
+                                    data=data, timeout=timeout)
+        except requests.HTTPError as exc:
+            if exc.response is not None:
+                info["status"] = exc.response.status_code
+            raise
+        info.update(status=r.status_code, bytes=len(r.content), retries=getattr(r, "ads_retries", 0))
+        data = r.json() or {}
+        if CACHE is not None:
+            CACHE.put(key, endpoint, data)
+        return data
+
+def iter_libraries(rows: int = LIBRARY_PAGE_ROWS) -> Iterator[Dict]:
+    """Page through the user's /biblib/libraries listing."""
+    start = 0
+    while True:
+        params = {"start": start, "rows": rows}
+        libs = ads_json("GET", "biblib/libraries", params=params).get("libraries", [])
+        yield from libs
+        if len(libs) < rows:
+            return
+        start += len(libs)
+
+@traced("library")
 def find_library_id(library_name: str) -> str:
-    r = requests.get(f"{ADS_API}/biblib/libraries?rows=2000", headers=HEADERS)
-    r.raise_for_status()
-    libs = r.json().get("libraries", [])
-    for lib in libs:
+    names = []
+    for lib in iter_libraries():
         if lib.get("name") == library_name:
             return lib.get("id")
-    names = ", ".join(l.get("name") for l in libs)
-    die(f'Library "{library_name}" not found. Available: {names}')
-
-def get_bibcodes_for_library(library_id: str) -> list[str]:
-    base = f"{ADS_API}/biblib/libraries/{library_id}"
-    headers = {**HEADERS, "Accept": "application/json"}
-    for url in (base, base + "/"):
-        r = requests.get(url, headers=headers, params={"rows": 2000})
-        if r.status_code == 200:
-            data = r.json() or {}
-            docs = data.get("documents") or data.get("docs") or []
-            # docs may be a list of bibcodes or objects; normalize to bibcodes
-            if docs and isinstance(docs[0], dict):
-                return [d.get("bibcode") for d in docs if d.get("bibcode")]
-            return docs
-        elif r.status_code == 404:
-            continue  # try the alternate URL form
+        names.append(lib.get("name"))
+    die(f'Library "{library_name}" not found. Available: {", ".join(names)}')
+
+def iter_library_bibcodes(library_id: str, rows: int = BIBCODE_PAGE_ROWS) -> Iterator[str]:
+    """Stream a library's bibcodes page by page (start/rows), so large libraries are not truncated."""
+    base = f"biblib/libraries/{library_id}"
+    headers = {"Accept": "application/json"}
+    paths = [base, base + "/"]
+    start = 0
+    while True:
+        params = {"start": start, "rows": rows}
+        for path in list(paths):
+            try:
+                data = ads_json("GET", path, params=params, headers=headers)
+                break
+            except requests.HTTPError as exc:
+                r = exc.response
+                if r is not None and r.status_code == 404:
+                    paths.remove(path)  # try the alternate URL form
+                    continue
+                raise SystemExit(f"{exc}\nResponse: {r.text[:500] if r is not None else ''}")
         else:
-            raise SystemExit(f"{r.status_code} {r.reason} for {url}\nResponse: {r.text[:500]}")
-    raise SystemExit(f"Library {library_id} not found at {base} (tried with and without trailing slash).")
-
-def chunked(lst, n):
-    for i in range(0, len(lst), n):
-        yield lst[i:i+n]
+            raise SystemExit(f"Library {library_id} not found at {base} (tried with and without trailing slash).")
+        paths = [path]
+        docs = data.get("documents") or data.get("docs") or []
+        # docs may be a list of bibcodes or objects; normalize to bibcodes
+        if docs and isinstance(docs[0], dict):
+            yield from (d.get("bibcode") for d in docs if d.get("bibcode"))
+        else:
+            yield from docs
+        start += len(docs)
+        total = coerce_int((data.get("metadata") or {}).get("num_documents"))
+        if len(docs) < rows or (total and start >= total):
+            return
+
+@traced("bibcodes")
+@checkpointed("bibcodes")
+def get_bibcodes_for_library(library_id: str) -> list[str]:
+    return list(iter_library_bibcodes(library_id))
+
+def recorded(items: Iterable, sink: List) -> Iterator:
+    """Pass items through while appending them to sink (e.g. bibcodes needed later for /metrics)."""
+    for x in items:
+        sink.append(x)
+        yield x
+
+def chunked(items: Iterable, n: int) -> Iterator[List]:
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, n))
+        if not chunk:
+            return
+        yield chunk
 
 def coerce_int(val) -> int:
     try:
@@ -228,8 +770,7 @@ def read_existing_delta_year(path: str) -> int:
     if not path or not os.path.exists(path):
         return 0
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f) or {}
+        data = read_yaml(path) or {}
     except Exception:
         return 0
     val = data.get("delta_year")
@@ -237,22 +778,19 @@ def read_existing_delta_year(path: str) -> int:
         val = (data.get("metrics") or {}).get("delta_year")
     return coerce_int(val)
 
+@traced("metrics fetch")
+@checkpointed("metrics")
 def fetch_metrics(bibcodes: List[str]) -> Dict:
     if not bibcodes:
         return {}
-    headers = {**HEADERS, "Content-Type": "application/json"}
+    headers = {"Content-Type": "application/json"}
     payload = {"bibcodes": bibcodes}
-    last_err = None
-    for attempt in range(3):
-        try:
-            r = requests.post(f"{ADS_API}/metrics", headers=headers, json=payload, timeout=60)
-            r.raise_for_status()
-            return r.json() or {}
-        except requests.exceptions.RequestException as exc:
-            last_err = exc
-            time.sleep(2 * (attempt + 1))
-    raise SystemExit(f"ADS metrics request failed after retries: {last_err}")
+    try:
+        return ads_json("POST", "metrics", payload=payload, headers=headers, timeout=(10, 120))
+    except requests.exceptions.RequestException as exc:
+        raise SystemExit(f"ADS metrics request failed after retries: {exc}")
 
+@traced("metrics build")
 def build_metrics_payload(metrics_raw: Dict, mapped: List[Dict], delta_year: int = 0) -> Dict:
     basic = pick_section(metrics_raw, "basic")
     citation = pick_section(metrics_raw, "citation")
@@ -321,44 +859,209 @@ def build_metrics_payload(metrics_raw: Dict, mapped: List[Dict], delta_year: int
         },
     }
 
-def fetch_bibtex_months(bibcodes: List[str]) -> Dict[str, Dict[str, str]]:
+def month_entry(num: str) -> Optional[Dict[str, str]]:
+    num = (num or "").zfill(2)
+    token = MONTH_TOKENS.get(num)
+    return {"token": token, "num": num} if token else None
+
+def month_from_pubdate(pubdate: str) -> Optional[Dict[str, str]]:
+    """ADS pubdate is 'YYYY-MM-DD' with '00' for unknown parts."""
+    parts = (pubdate or "").split("-")
+    return month_entry(parts[1]) if len(parts) > 1 else None
+
+def parse_export_months(text: str) -> Dict[str, Dict[str, str]]:
+    out: Dict[str, Dict[str, str]] = {}
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) < 2 or "/" not in fields[-1]:
+            continue
+        entry = month_entry(fields[-1].split("/", 1)[0])
+        if entry:
+            out[fields[0]] = entry
+    return out
+
+@traced("months export")
+def fetch_export_months_chunk(chunk: List[str]) -> Dict[str, Dict[str, str]]:
     """
-    Query ADS /export/bibtex for many bibcodes at once and extract BibTeX month.
+    Month lookup for bibcodes whose pubdate has no month, via a minimal
+    /export/custom format instead of full BibTeX records.
     Returns { bibcode: {"token": "jun", "num": "06"} } for those that have it.
     """
-    if not bibcodes:
-        return {}
-    out: Dict[str, Dict[str,str]] = {}
-    headers = {**HEADERS, "Content-Type": "application/json"}
-
-    for chunk in chunked(bibcodes, 100):
-        r = requests.post(f"{ADS_API}/export/bibtex", headers=headers, json={"bibcode": chunk}, timeout=30)
-        r.raise_for_status()
-        text = (r.json() or {}).get("export", "")
-
-        # Split concatenated bibtex entries; key is the bibcode after @TYPE{
-        for m in re.finditer(r'@[\w\-]+\{([^,]+),(.*?)\n\}\s*', text, flags=re.S):
-            code = m.group(1).strip()
-            body = m.group(2)
-            mm = re.search(r'(?mi)^\s*month\s*=\s*[{\"]?([A-Za-z]{3})', body)
-            if mm:
-                token = mm.group(1).lower()
-                num = BIB_MONTHS.get(token)
-                if num:
-                    out[code] = {"token": token, "num": num}
+    # journaled per bibcode: gap chunks are filled in completion order, so
+    # their composition differs between a run and its resume
+    out: Dict[str, Dict[str, str]] = {}
+    if JOURNAL is not None:
+        done = {b: JOURNAL.get("months", b) for b in chunk}
+        out = {b: entry for b, entry in done.items() if entry}
+        chunk = [b for b, entry in done.items() if entry is None]
+        if not chunk:
+            return out
+    headers = {"Content-Type": "application/json"}
+    payload = {"bibcode": chunk, "format": MONTH_EXPORT_FORMAT}
+    data = ads_json("POST", "export/custom", payload=payload, headers=headers, timeout=30)
+    months = parse_export_months(data.get("export", ""))
+    if JOURNAL is not None:
+        JOURNAL.put_many("months", {b: months.get(b, {}) for b in chunk})
+    out.update(months)
+    return out
+
+# ---- local metrics engine ----
+# --local-metrics: h/g/i10, totals and per-year histograms are computed from
+# per-paper citations-by-year kept in METRICS_STORE_NAME. Citing years come
+# from the ADS `citation` field (citing bibcodes start with the year) and
+# are refetched only for papers whose citation count changed. /metrics is
+# called only for reads, and skipped when no citation count changed.
+
+CITATION_FIELDS = ["bibcode", "year", "citation_count", "citation"]
+
+def compute_h_index(counts) -> int:
+    ranked = sorted(counts, reverse=True)
+    return sum(1 for i, c in enumerate(ranked, 1) if c >= i)
+
+def compute_g_index(counts) -> int:
+    g, total = 0, 0
+    for i, c in enumerate(sorted(counts, reverse=True), 1):
+        total += c
+        if total >= i * i:
+            g = i
+    return g
+
+def indices_by_year(pub_years: List[int], cites_by_year: List[Dict[int, int]], years: List[int]) -> Dict[str, Dict[str, int]]:
+    """
+    h/g/i10 for every year Y, counting papers published up to Y and the
+    citations they had received by Y.
+    """
+    out = {"h": {}, "g": {}, "i10": {}}
+    if not years or not pub_years:
+        return out
+    if np is None:
+        for y in years:
+            counts = [sum(c for cy, c in cites.items() if cy <= y)
+                      for py, cites in zip(pub_years, cites_by_year) if py <= y]
+            out["h"][str(y)] = compute_h_index(counts)
+            out["g"][str(y)] = compute_g_index(counts)
+            out["i10"][str(y)] = sum(1 for c in counts if c >= 10)
+        return out
+
+    y0 = years[0]
+    grid = np.zeros((len(pub_years), len(years)), dtype=np.int64)
+    for i, cites in enumerate(cites_by_year):
+        for cy, c in cites.items():
+            if cy <= years[-1]:
+                grid[i, max(cy - y0, 0)] += c
+    cum = np.cumsum(grid, axis=1)                                  # citations received by year Y
+    published = np.asarray(pub_years)[:, None] <= np.asarray(years)[None, :]
+    cum = np.where(published, cum, -1)                             # not yet published -> excluded
+    ranked = -np.sort(-cum, axis=0)                                # per-year, descending
+    rank = np.arange(1, len(pub_years) + 1)[:, None]
+    h = ((ranked >= rank) & (ranked >= 0)).sum(axis=0)
+    g = ((np.cumsum(np.clip(ranked, 0, None), axis=0) >= rank ** 2) & (ranked >= 0)).sum(axis=0)
+    i10 = (cum >= 10).sum(axis=0)
+    for j, y in enumerate(years):
+        out["h"][str(y)] = int(h[j])
+        out["g"][str(y)] = int(g[j])
+        out["i10"][str(y)] = int(i10[j])
     return out
 
+class MetricsStore:
+    """Per-paper citations by year plus the last reads data from /metrics, persisted as JSON."""
+
+    def __init__(self, path: str):
+        self.path = path
+        data = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        self.papers: Dict[str, Dict] = data.get("papers", {})
+        self.reads: Dict = data.get("reads", {})
+        self.read10: Dict = data.get("read10", {})
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with atomic_open(self.path) as f:
+            json.dump({"papers": self.papers, "reads": self.reads, "read10": self.read10}, f,
+                      separators=(",", ":"))
+
+    @traced("citations refresh")
+    def refresh(self, counts: Dict[str, int], years: Dict[str, int]) -> bool:
+        """Sync with the current citation counts; returns True if anything changed."""
+        removed = [b for b in self.papers if b not in counts]
+        for b in removed:
+            del self.papers[b]
+        stale = [b for b, c in counts.items()
+                 if b not in self.papers or self.papers[b]["citation_count"] != c]
+        for d in fetch_metadata_for_bibcodes(stale, CITATION_FIELDS):
+            by_year: Dict[str, int] = {}
+            for citing in d.get("citation") or []:
+                by_year[citing[:4]] = by_year.get(citing[:4], 0) + 1
+            self.papers[d["bibcode"]] = {
+                "year": coerce_int(d.get("year")) or years.get(d["bibcode"], 0),
+                "citation_count": coerce_int(d.get("citation_count")),
+                "citations": by_year,
+            }
+        return bool(removed or stale)
+
+    def keep_reads(self, metrics_raw: Dict) -> None:
+        histograms = metrics_raw.get("histograms") or pick_section(metrics_raw, "histogram")
+        time_series = metrics_raw.get("time series") or pick_section(metrics_raw, "time series")
+        self.reads = pick_histogram(histograms, ["reads", "read"])
+        self.read10 = (time_series or {}).get("read10") or {}
+
+    def metrics_raw(self) -> Dict:
+        """An ADS /metrics-shaped response, so build_metrics_payload is shared with the remote path."""
+        current_year = int(time.strftime("%Y"))
+        papers = list(self.papers.values())
+        pub_years = [p["year"] for p in papers]
+        cites = [{coerce_int(y): c for y, c in p["citations"].items()} for p in papers]
+        counts = [p["citation_count"] for p in papers]
+        years = list(range(min(pub_years), current_year + 1)) if pub_years else []
+
+        pubs_hist = {str(y): 0 for y in years}
+        for y in pub_years:
+            pubs_hist[str(y)] = pubs_hist.get(str(y), 0) + 1
+        cites_hist = {str(y): 0 for y in years}
+        for c in cites:
+            for y, n in c.items():
+                if y <= current_year:
+                    cites_hist[str(y)] = cites_hist.get(str(y), 0) + n
+        series = indices_by_year(pub_years, cites, years)
+
+        return {
+            "basic stats": {"number of papers": len(papers)},
+            "citation stats": {"total number of citations": sum(counts)},
+            "indicators": {"h": compute_h_index(counts), "g": compute_g_index(counts),
+                           "i10": sum(1 for c in counts if c >= 10)},
+            "time series": {**series, "read10": self.read10},
+            "histograms": {
+                "publications": {"all publications": pubs_hist},
+                "citations": {"all citations": cites_hist},
+                "reads": self.reads,
+            },
+        }
+
+def local_metrics_raw(store_path: str, bibs: List[str], mapped: List[Dict]) -> Dict:
+    store = MetricsStore(store_path)
+    counts = {m["bibcode"]: coerce_int(m.get("citations")) for m in mapped if m.get("bibcode")}
+    years = {m["bibcode"]: coerce_int(m.get("year")) for m in mapped if m.get("bibcode")}
+    changed = store.refresh(counts, years)
+    if changed or not store.reads:
+        store.keep_reads(fetch_metrics(bibs))
+    else:
+        print("Citation counts unchanged; skipped /metrics")
+    store.save()
+    return store.metrics_raw()
+
 def derive_sortdate_from_fields(pub: str, year: str, arxiv_id: str, refereed: bool,
-                                bibcode: str) -> tuple[str, str, str]:
+                                bibcode: str, months: Optional[Dict] = None) -> tuple[str, str, str]:
     """
     Returns (sortdate, month_token, month_num).
-      - Refereed journals: use BibTeX month -> YYYY-MM-15
+      - Refereed journals: use publication month (pubdate/export) -> YYYY-MM-15
       - arXiv e-prints: YYMM from arXiv id -> 20YY-MM-31
       - Fallbacks: refereed -> YYYY-06-30, else YYYY-01-01
     """
-    # 1) refereed journal month from BibTeX
+    # 1) refereed journal month from pubdate / export
     if refereed and pub and pub != "arXiv e-prints":
-        mm = BIBTEX_MONTH_BY_BIBCODE.get(bibcode) or {}
+        mm = (months or {}).get(bibcode) or {}
         mnum = mm.get("num")
         if year and mnum:
             return f"{year}-{mnum}-15", mm.get("token",""), mnum
@@ -377,24 +1080,219 @@ def derive_sortdate_from_fields(pub: str, year: str, arxiv_id: str, refereed: bo
 
     return "", "", ""
 
-def fetch_metadata_for_bibcodes(bibcodes: List[str]) -> List[Dict]:
-    """Use /search/query in chunks to pull fields we need."""
-    fields = [
-        "bibcode", "title", "author", "year", "pub", "volume", "page",
-        "page_range", "doi", "identifier", "citation_count", "pubdate",
-        "property"
-    ]
+METADATA_FIELDS = [
+    "bibcode", "title", "author", "year", "pub", "volume", "page",
+    "page_range", "doi", "identifier", "citation_count", "pubdate",
+    "property"
+]
+
+def fetch_metadata_query(chunk: List[str], fields: List[str] = METADATA_FIELDS) -> List[Dict]:
+    q = ' OR '.join([f'bibcode:"{b}"' for b in chunk])
+    params = {"q": q, "fl": ",".join(fields), "rows": 200}
+    return ads_json("GET", "search/query", params=params).get("response", {}).get("docs", [])
+
+def fetch_metadata_bigquery(chunk: List[str], fields: List[str] = METADATA_FIELDS) -> List[Dict]:
+    """POST the bibcode list to /search/bigquery and page through the results."""
+    body = "bibcode\n" + "\n".join(chunk)
+    headers = {"Content-Type": "big-query/csv"}
+    out, start = [], 0
+    while True:
+        params = {"q": "*:*", "fl": ",".join(fields), "rows": BIGQUERY_CHUNK, "start": start}
+        resp = ads_json("POST", "search/bigquery", params=params, data=body, headers=headers).get("response", {})
+        docs = resp.get("docs", [])
+        out.extend(docs)
+        start += len(docs)
+        if not docs or start >= coerce_int(resp.get("numFound")):
+            return out
+
+BIGQUERY_OK = True  # flipped off once bigquery turns out to be unsupported
+BIGQUERY_UNSUPPORTED = (400, 404, 405)   # endpoint/method rejected; anything else may be transient
+
+@checkpointed("metadata")
+def fetch_metadata_chunk(chunk: List[str], fields: List[str] = METADATA_FIELDS) -> List[Dict]:
+    """Bigquery first; fall back to concurrent OR-queries if the endpoint is unavailable."""
+    global BIGQUERY_OK
+    if BIGQUERY_OK:
+        try:
+            return fetch_metadata_bigquery(chunk, fields)
+        except requests.HTTPError as exc:
+            status = exc.response.status_code if exc.response is not None else None
+            if status in BIGQUERY_UNSUPPORTED:
+                BIGQUERY_OK = False
+                print(f"bigquery unavailable ({exc}); falling back to /search/query", file=sys.stderr)
+            else:
+                print(f"bigquery failed ({exc}); using /search/query for this chunk", file=sys.stderr)
+    out = []
+    for docs in run_chunks(lambda c: fetch_metadata_query(c, fields), list(chunked(chunk, METADATA_CHUNK))):
+        out.extend(docs)
+    return out
+
+def fetch_metadata_for_bibcodes(bibcodes: List[str], fields: List[str] = METADATA_FIELDS) -> List[Dict]:
+    """Pull the fields we need via /search/bigquery (or /search/query chunks)."""
     out = []
-    for chunk in chunked(bibcodes, 50):
-        q = ' OR '.join([f'bibcode:"{b}"' for b in chunk])
-        params = {"q": q, "fl": ",".join(fields), "rows": 200}
-        r = requests.get(f"{ADS_API}/search/query", headers=HEADERS, params=params)
-        r.raise_for_status()
-        docs = r.json().get("response", {}).get("docs", [])
+    for docs in run_chunks(lambda c: fetch_metadata_chunk(c, fields), list(chunked(bibcodes, BIGQUERY_CHUNK))):
         out.extend(docs)
-        time.sleep(0.1)  # be gentle
     return out
 
+def needs_month(d: Dict) -> bool:
+    return d.get("pub") != "arXiv e-prints" and "REFEREED" in (d.get("property") or [])
+
+@traced("fetch")
+def fetch_docs_and_months(bibcodes: Iterable[str]) -> Tuple[List[Dict], Dict[str, Dict[str, str]]]:
+    """
+    Metadata and month stages overlapped on one pool. Months come from the
+    pubdate already in the metadata; refereed bibcodes whose pubdate has no
+    month are queued for /export/custom as soon as their metadata chunk
+    returns, while the remaining chunks are still in flight. bibcodes may be
+    a lazy stream; at most 2 x CONCURRENCY metadata chunks are in flight.
+    """
+    results: Dict[int, List[Dict]] = {}
+    months: Dict[str, Dict[str, str]] = {}
+    gaps: List[str] = []
+    export_futs = []
+    with ThreadPoolExecutor(max_workers=max(CONCURRENCY, 1)) as pool:
+        inflight = {}
+
+        def collect(fut):
+            docs = fut.result()
+            results[inflight.pop(fut)] = docs
+            for d in docs:
+                if not needs_month(d):
+                    continue
+                entry = month_from_pubdate(d.get("pubdate", ""))
+                if entry:
+                    months[d.get("bibcode", "")] = entry
+                else:
+                    gaps.append(d.get("bibcode", ""))
+            while len(gaps) >= EXPORT_CHUNK:
+                export_futs.append(pool.submit(fetch_export_months_chunk, gaps[:EXPORT_CHUNK]))
+                del gaps[:EXPORT_CHUNK]
+
+        for i, chunk in enumerate(chunked(bibcodes, BIGQUERY_CHUNK)):
+            inflight[pool.submit(fetch_metadata_chunk, chunk)] = i
+            if len(inflight) >= 2 * max(CONCURRENCY, 1):
+                done, _ = wait(list(inflight), return_when=FIRST_COMPLETED)
+                for fut in done:
+                    collect(fut)
+        for fut in as_completed(list(inflight)):
+            collect(fut)
+        if gaps:
+            export_futs.append(pool.submit(fetch_export_months_chunk, list(gaps)))
+        for fut in export_futs:
+            months.update(fut.result())
+    docs = [d for i in sorted(results) for d in results[i]]
+    return docs, months
+
+def index_docs(docs: List[Dict]) -> Dict[str, Dict]:
+    """
+    Docs by bibcode and by every identifier ADS lists for them (alternate
+    bibcodes, arXiv ids), so a library bibcode ADS has since canonicalized
+    (e.g. arXiv -> journal) still finds its doc. Real bibcodes win over aliases.
+    """
+    out: Dict[str, Dict] = {}
+    for d in docs:
+        for alias in d.get("identifier") or []:
+            out.setdefault(alias, d)
+    for d in docs:
+        out[d.get("bibcode", "")] = d
+    return out
+
+def fetch_chunk_with_months(chunk: List[str]) -> Tuple[List[Dict], Dict[str, Dict[str, str]]]:
+    """One metadata chunk plus the months of its refereed papers (pubdate, then /export/custom for gaps)."""
+    docs = fetch_metadata_chunk(chunk)
+    months: Dict[str, Dict[str, str]] = {}
+    gaps = []
+    for d in docs:
+        if not needs_month(d):
+            continue
+        entry = month_from_pubdate(d.get("pubdate", ""))
+        if entry:
+            months[d.get("bibcode", "")] = entry
+        else:
+            gaps.append(d.get("bibcode", ""))
+    for part in chunked(gaps, EXPORT_CHUNK):
+        months.update(fetch_export_months_chunk(part))
+    return docs, months
+
+def iter_docs_and_months(bibcodes: Iterable[str]) -> Iterator[Tuple[List[Dict], Dict[str, Dict[str, str]]]]:
+    """
+    Streaming counterpart of fetch_docs_and_months: yields (docs, months) per
+    chunk as soon as it is complete, in completion order, with at most
+    2 x CONCURRENCY chunks downloading while the caller maps earlier ones.
+    """
+    with ThreadPoolExecutor(max_workers=max(CONCURRENCY, 1)) as pool:
+        pending = set()
+        for chunk in chunked(bibcodes, BIGQUERY_CHUNK):
+            pending.add(pool.submit(fetch_chunk_with_months, chunk))
+            while len(pending) >= 2 * max(CONCURRENCY, 1):
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    yield fut.result()
+        for fut in as_completed(pending):
+            yield fut.result()
+
+@traced("citations")
+def fetch_library_citations(library_id: str) -> Dict[str, int]:
+    """One lightweight query for the volatile citation counts of a whole library."""
+    out: Dict[str, int] = {}
+    start = 0
+    while True:
+        params = {"q": f"docs(library/{library_id})", "fl": "bibcode,citation_count",
+                  "rows": 2000, "start": start}
+        resp = ads_json("GET", "search/query", params=params).get("response", {})
+        docs = resp.get("docs", [])
+        for d in docs:
+            out[d.get("bibcode", "")] = coerce_int(d.get("citation_count"))
+        start += len(docs)
+        if not docs or start >= coerce_int(resp.get("numFound")):
+            return out
+
+@traced("map")
+def map_docs(docs: List[Dict], months: Dict[str, Dict[str, str]]) -> List[Dict]:
+    """map_doc + add_tags, using publication months for refereed, non-arXiv items."""
+    with TRACER.cpu_profile() if TRACER is not None else nullcontext():
+        mapped = [map_doc(d, months) for d in docs]
+        return [add_tags(m) for m in mapped]         # keep your tagging step
+
+def sync_incremental(library_id: str, bibs: List[str], existing: List[Dict],
+                     snapshot: Optional[str] = None) -> List[Dict]:
+    """
+    Reuse entries from an existing papers_all.yml:
+      - fetch metadata/months only for new bibcodes and non-refereed entries
+        (arXiv preprints may have been published since the last run)
+      - drop entries no longer in the library; an entry whose recheck
+        returns no doc keeps its previous record
+      - refresh citation counts with a single library-wide query
+    and, if snapshot exists, carry the raw snapshot forward the same way.
+    """
+    current = set(bibs)
+    known = {m.get("bibcode"): m for m in existing if m.get("bibcode")}
+    added = [b for b in bibs if b not in known]
+    recheck = [b for b in bibs if b in known and not known[b].get("refereed")]
+    removed = [b for b in known if b not in current]
+
+    docs, months = fetch_docs_and_months(added + recheck) if (added or recheck) else ([], {})
+    fresh = map_docs(docs, months)
+    by_code = index_docs(docs)
+    resolved = {b for b in added + recheck if b in by_code}     # under their old bibcode too
+    misses = [b for b in added + recheck if b not in resolved]
+    if misses:
+        print(f"Incremental: {len(misses)} bibcodes not returned by ADS "
+              f"(rechecked ones keep their previous record): {', '.join(misses)}", file=sys.stderr)
+    replaced = resolved | {m["bibcode"] for m in fresh}
+    kept = [m for b, m in known.items() if b in current and b not in replaced]
+
+    citations = fetch_library_citations(library_id)
+    for m in kept:
+        if m["bibcode"] in citations:
+            m["citations"] = citations[m["bibcode"]]
+    kept = [add_tags(m) for m in kept]
+    if snapshot and os.path.exists(snapshot):
+        update_snapshot(snapshot, current - resolved, citations, docs, months)
+
+    print(f"Incremental: {len(added)} new, {len(removed)} removed, {len(recheck)} rechecked")
+    return kept + fresh
+
 def extract_arxiv(identifier_list: list, doi: str = "", bibcode: str = "", pub: str = "") -> str:
     """
     Return a clean arXiv id like '2507.06989' (no version), from:
@@ -433,17 +1331,7 @@ def extract_arxiv(identifier_list: list, doi: str = "", bibcode: str = "", pub:
 
     return ""
 
-def format_authors_html(authors: List[str], my_lastnames=("Villaseñor","Villasenor")) -> str:
-    if not authors: return ""
-    mynorms = [norm(n) for n in my_lastnames]
-    fmt = []
-    for a in authors:
-        last = a.split(",")[0] if "," in a else a.split()[-1]
-        is_me = norm(last) in mynorms
-        fmt.append(f"<strong>{a}</strong>" if is_me else a)
-    return ", ".join(fmt)
-
-def map_doc(d: Dict) -> Dict:
+def map_doc(d: Dict, months: Optional[Dict[str, Dict[str, str]]] = None) -> Dict:
     title   = clean_title((d.get("title") or [""])[0])
     authors = d.get("author") or []
     ids     = d.get("identifier") or []
@@ -469,24 +1357,24 @@ def map_doc(d: Dict) -> Dict:
     # Prefer publisher HTML for title (never arXiv), then DOI, else ADS
     best_url = pick_primary_url(doi, ids, adsurl)
 
-    # Display-friendly authors
-    authors_display = [format_author_display(a) for a in authors]
-    me_index = next((i for i, a in enumerate(authors) if is_me(a)), -1)
+    # Display-friendly authors, HTML lists and my position in one pass
+    rendered = render_authors(authors, max_authors=8)
 
-    # NEW: single chronological key using BibTeX month or arXiv month
+    # NEW: single chronological key using publication month or arXiv month
     sortdate, month_token, month_num = derive_sortdate_from_fields(
-        pub=pub, year=year, arxiv_id=arxiv, refereed=refereed_flag, bibcode=bibcode
+        pub=pub, year=year, arxiv_id=arxiv, refereed=refereed_flag, bibcode=bibcode,
+        months=months,
     )
 
     return {
         "bibcode": bibcode,
         "title": title,
         "authors": authors,
-        "authors_html": format_authors_html(authors),
-        "authors_short_html": format_authors_short_html(authors, max_authors=8),
-        "authors_display": authors_display,
-        "me_index": me_index,
-        "n_authors": len(authors),
+        "authors_html": rendered["authors_html"],
+        "authors_short_html": rendered["authors_short_html"],
+        "authors_display": rendered["authors_display"],
+        "me_index": rendered["me_index"],
+        "n_authors": rendered["n_authors"],
         "year": year,
         "pub": pub,
         "volume": d.get("volume", ""),
@@ -503,13 +1391,350 @@ def map_doc(d: Dict) -> Dict:
         "sortdate": sortdate,                         # NEW ('YYYY-MM-DD')
     }
 
-def write_yaml(path: str, items: List[Dict]):
-    with open(path, "w", encoding="utf-8") as f:
-        yaml.safe_dump(items, f, sort_keys=False, allow_unicode=True)
+def read_yaml(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.load(f, Loader=YAML_LOADER)
+
+def read_yaml_list(path: str) -> List[Dict]:
+    return read_yaml(path) or []
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+@contextmanager
+def atomic_open(path: str):
+    """
+    Write to a temp file next to path and rename it into place on success.
+    If the new bytes match the existing file it is left untouched (mtime
+    included); f.changed and f.sha256 are set once the block exits.
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        f.sha256 = file_sha256(tmp)
+        f.changed = not (os.path.exists(path) and os.path.getsize(path) == os.path.getsize(tmp)
+                         and file_sha256(path) == f.sha256)
+        if f.changed:
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        else:
+            os.unlink(tmp)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+def dump_yaml(data, f) -> None:
+    yaml.dump(data, f, Dumper=YAML_DUMPER, sort_keys=False, allow_unicode=True)
+
+def write_yaml_items(f, items: Iterable[Dict], batch: int = 200) -> int:
+    """
+    Stream a YAML list in small batches of entries; the text is identical to
+    dumping the whole list, without ever building it as one string.
+    """
+    n = 0
+    for block in chunked(items, batch):
+        dump_yaml(block, f)
+        n += len(block)
+    if not n:
+        f.write("[]\n")
+    return n
+
+def write_yaml(path: str, items) -> bool:
+    """Write items (a dict, or a list streamed in batches); returns False if the file was already identical."""
+    with atomic_open(path) as f:
+        if isinstance(items, dict):
+            dump_yaml(items, f)
+        else:
+            write_yaml_items(f, items)
+    if MANIFEST is not None:
+        MANIFEST.output(path, f.sha256, f.changed)
+    return f.changed
+
+# ---- change manifest ----
+# --manifest FILE: JSON summary of what a run changed, for scripts/sync_ads_pubs.sh
+# to decide whether a site build / commit is needed at all.
+
+class Manifest:
+    """Collects output hashes, bibcode and citation changes, and metric deltas for one run."""
+
+    def __init__(self):
+        self.outputs: Dict[str, Dict] = {}
+        self.publications: Dict[str, Dict] = {}
+        self.metrics: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+
+    def output(self, path: str, sha256: str, changed: bool) -> None:
+        with self.lock:
+            self.outputs[path] = {"sha256": sha256, "changed": changed}
+
+    def publications_diff(self, path: str, old: List[Dict], new: List[Dict]) -> None:
+        old_cites = {m.get("bibcode"): coerce_int(m.get("citations")) for m in old if m.get("bibcode")}
+        new_cites = {m.get("bibcode"): coerce_int(m.get("citations")) for m in new if m.get("bibcode")}
+        diff = {
+            "added": [b for b in new_cites if b not in old_cites],
+            "removed": [b for b in old_cites if b not in new_cites],
+            "citations": {b: [old_cites[b], c] for b, c in new_cites.items()
+                          if b in old_cites and old_cites[b] != c},
+        }
+        with self.lock:
+            self.publications[path] = diff
+
+    def metrics_diff(self, path: str, old: Dict, new: Dict) -> None:
+        old_m, new_m = (old or {}).get("metrics") or {}, new.get("metrics") or {}
+        diff = {k: [old_m.get(k), v] for k, v in new_m.items()
+                if k != "deltas" and old_m.get(k) != v}
+        with self.lock:
+            self.metrics[path] = diff
+
+    def write(self, path: str) -> None:
+        data = {
+            "generated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "changed": any(o["changed"] for o in self.outputs.values()),
+            "outputs": self.outputs,
+            "publications": self.publications,
+            "metrics": self.metrics,
+        }
+        with atomic_open(path) as f:
+            json.dump(data, f, indent=2)
+            f.write("\n")
+
+MANIFEST: Optional[Manifest] = None  # set in main() by --manifest
+
+# ---- compact publications format ----
+# Opt-in (--compact): each paper references an interned author table written
+# next to it (papers_all.yml -> papers_all_authors.yml) by position instead of
+# carrying authors / authors_display / authors_html itself; only the short
+# HTML the lists render by default is kept. The table is three parallel
+# lists ({names, display, me}), not one mapping per author, so an author
+# costs two YAML lines however many papers they are on. one_pub.html builds
+# the full author list from the table when it is shown.
+
+COMPACT_DROP = ("authors", "authors_display", "authors_html")
+
+class FlowList(list):
+    """List dumped inline ([0, 4, 17]) rather than one item per line."""
+
+yaml.add_representer(
+    FlowList,
+    lambda dumper, data: dumper.represent_sequence("tag:yaml.org,2002:seq", data, flow_style=True),
+    Dumper=YAML_DUMPER,
+)
+
+def compact_authors_path(path: str) -> str:
+    stem, ext = os.path.splitext(path)
+    return f"{stem}_authors{ext or '.yml'}"
+
+def new_author_table() -> Dict[str, List]:
+    return {"names": [], "display": [], "me": FlowList()}
+
+def compact_papers(mapped: Iterable[Dict], table: Dict[str, List]) -> Iterator[Dict]:
+    """Yield compact papers one by one, adding newly seen authors to table (see new_author_table)."""
+    index: Dict[str, int] = {}
+    for m in mapped:
+        ids = []
+        for name, disp in zip(m.get("authors") or [], m.get("authors_display") or []):
+            aid = index.get(name)
+            if aid is None:
+                aid = index[name] = len(table["names"])
+                table["names"].append(name)
+                table["display"].append(disp)
+                if ME(name):
+                    table["me"].append(aid)
+            ids.append(aid)
+        paper = {}
+        for k, v in m.items():
+            if k == "authors":
+                paper["author_ids"] = FlowList(ids)
+            elif k not in COMPACT_DROP:
+                paper[k] = v
+        yield paper
+
+def from_compact(papers: List[Dict], table: Dict[str, List]) -> List[Dict]:
+    """Rebuild full-format entries (as map_doc emits them) from the compact form."""
+    out = []
+    names = table.get("names") or []
+    for p in papers:
+        if "author_ids" not in p:
+            out.append(p)
+            continue
+        authors = [names[i] for i in p["author_ids"]]
+        rendered = render_authors(authors, max_authors=8)
+        m = {}
+        for k, v in p.items():
+            if k == "author_ids":
+                m["authors"] = authors
+                m["authors_html"] = rendered["authors_html"]
+                m["authors_short_html"] = p.get("authors_short_html", rendered["authors_short_html"])
+                m["authors_display"] = rendered["authors_display"]
+            elif k != "authors_short_html":
+                m[k] = v
+        out.append(m)
+    return out
 
-def is_me(name: str, my_lastnames=("Villaseñor","Villasenor")) -> bool:
-    last = name.split(",")[0] if "," in name else name.split()[-1]
-    return norm(last) in [norm(x) for x in my_lastnames]
+@traced("read publications")
+def read_publications(path: str, shards: Optional[str] = None) -> List[Dict]:
+    """Load a publications file (or its year shards) in either the full or the compact format."""
+    papers = read_shards(shards) if shards else read_yaml_list(path)
+    if papers and "author_ids" in papers[0]:
+        papers = from_compact(papers, read_yaml(compact_authors_path(path)) or {})
+    return papers
+
+def publications_exist(path: str, shards: Optional[str] = None) -> bool:
+    return os.path.exists(os.path.join(shards, SHARD_INDEX) if shards else path)
+
+@traced("write publications")
+def write_publications(path: str, mapped: Iterable[Dict], compact: bool = False,
+                       summary: Optional[List[Dict]] = None, shards: Optional[str] = None) -> None:
+    """
+    mapped may be a one-shot stream (see iter_merged) when summary, the
+    SUMMARY_FIELDS of the same papers in the same order, is given.
+    """
+    if summary is None:
+        summary = mapped
+    if MANIFEST is not None:
+        old = read_publications(path, shards) if publications_exist(path, shards) else []
+        MANIFEST.publications_diff(path, old, summary)
+    table = new_author_table()
+    if compact:
+        mapped = compact_papers(mapped, table)
+    if shards:
+        order = write_shards(shards, mapped, summary)
+        write_yaml(views_path(path), build_views([summary[i] for i in order]))
+        remove_output(path)
+    else:
+        write_yaml(views_path(path), build_views(summary))
+        write_yaml(path, mapped)
+    if compact:
+        write_yaml(compact_authors_path(path), table)
+
+# ---- precomputed views ----
+# Written next to the publications file (papers_all.yml -> papers_all_views.yml):
+# positions into that file for each ordering the includes need, so Liquid
+# only slices ready-made lists instead of sorting the whole dataset per page.
+# The bibcode at every position is stored too; the includes check the
+# positions they render against it (views_check.html) and fall back to
+# sorting if papers_all.yml was edited by hand.
+
+def views_path(path: str) -> str:
+    stem, ext = os.path.splitext(path)
+    return f"{stem}_views{ext or '.yml'}"
+
+def group_by_year(order: List[int], mapped: List[Dict]) -> List[Dict]:
+    """[{year, items}] newest year first, keeping the given order inside each year."""
+    groups: Dict[str, List[int]] = {}
+    for i in order:
+        groups.setdefault(str(mapped[i].get("year") or ""), []).append(i)
+    return [{"year": y, "items": FlowList(groups[y])}
+            for y in sorted(groups, key=lambda y: coerce_int(y), reverse=True)]
+
+def build_views(mapped: List[Dict]) -> Dict:
+    newest = sorted(range(len(mapped)), key=lambda i: (mapped[i].get("sortdate", ""), mapped[i].get("bibcode", "")),
+                    reverse=True)
+    most_cited = sorted(newest, key=lambda i: coerce_int(mapped[i].get("citations")), reverse=True)
+    tags: Dict[str, List[int]] = {}
+    for i in newest:
+        for tag in mapped[i].get("tags") or []:
+            tags.setdefault(tag, []).append(i)
+    return {
+        "count": len(mapped),
+        "bibcodes": FlowList(m.get("bibcode", "") for m in mapped),   # lets the includes detect stale views
+        "latest": FlowList(newest),
+        "most_cited": FlowList(most_cited),
+        "first_second": FlowList(i for i in newest if mapped[i].get("me_index") in (0, 1)),
+        "by_year": group_by_year(newest, mapped),
+        "tags": {tag: group_by_year(order, mapped) for tag, order in sorted(tags.items())},
+    }
+
+# ---- year shards ----
+# Opt-in (--shards [DIR]): instead of one papers_all.yml, each year goes to
+# DIR/<year>.yml and DIR/index.yml lists the years (newest first) with their
+# counts. Shards whose bytes did not change are not rewritten, so a citation
+# bump touches one or two files and `jekyll build --incremental` only sees
+# those. The views index into the shards concatenated in index order.
+
+SHARD_INDEX = "index.yml"
+
+def shard_name(m: Dict) -> str:
+    year = str(m.get("year") or "")
+    return year if year.isdigit() else "unknown"
+
+def shard_groups(summary: List[Dict]) -> Tuple[List[str], Dict[str, List[int]]]:
+    """Shard names newest first, and the positions of each shard's papers in summary order."""
+    groups: Dict[str, List[int]] = {}
+    for i, m in enumerate(summary):
+        groups.setdefault(shard_name(m), []).append(i)
+    return sorted(groups, key=coerce_int, reverse=True), groups
+
+def remove_output(path: str) -> None:
+    if os.path.exists(path):
+        os.unlink(path)
+        if MANIFEST is not None:
+            MANIFEST.output(path, None, True)
+
+@traced("write shards")
+def write_shards(folder: str, mapped: Iterable[Dict], summary: List[Dict], batch: int = 200) -> List[int]:
+    """
+    Stream mapped (in summary order) into one file per year and write the
+    index; stale shards are removed. Returns summary positions in shard order.
+    """
+    years, groups = shard_groups(summary)
+    os.makedirs(folder, exist_ok=True)
+    with ExitStack() as stack:
+        files = {y: stack.enter_context(atomic_open(os.path.join(folder, f"{y}.yml"))) for y in years}
+        pending: Dict[str, List[Dict]] = {y: [] for y in years}
+        for m, s in zip(mapped, summary):
+            y = shard_name(s)
+            pending[y].append(m)
+            if len(pending[y]) >= batch:
+                dump_yaml(pending[y], files[y])
+                pending[y] = []
+        for y, block in pending.items():
+            if block:
+                dump_yaml(block, files[y])
+    if MANIFEST is not None:
+        for y, f in files.items():
+            MANIFEST.output(os.path.join(folder, f"{y}.yml"), f.sha256, f.changed)
+    for name in sorted(os.listdir(folder)):
+        stem, ext = os.path.splitext(name)
+        if ext == ".yml" and name != SHARD_INDEX and stem not in groups:
+            remove_output(os.path.join(folder, name))
+    write_yaml(os.path.join(folder, SHARD_INDEX), {
+        "count": len(summary),
+        "years": [{"year": y, "count": len(groups[y])} for y in years],
+    })
+    return [i for y in years for i in groups[y]]
+
+def read_shards(folder: str) -> List[Dict]:
+    index = read_yaml(os.path.join(folder, SHARD_INDEX)) or {}
+    papers: List[Dict] = []
+    for entry in index.get("years") or []:
+        papers.extend(read_yaml_list(os.path.join(folder, f"{entry['year']}.yml")))
+    return papers
+
+class AuthorMatcher:
+    """Decides whether an ADS author string is me; last names are normalized once."""
+
+    def __init__(self, lastnames=MY_LASTNAMES):
+        self.lastnames = frozenset(norm(n) for n in lastnames)
+
+    def __call__(self, name: str) -> bool:
+        last = name.split(",")[0] if "," in name else name.split()[-1]
+        return norm(last) in self.lastnames
+
+ME = AuthorMatcher()
+
+def is_me(name: str, my_lastnames=MY_LASTNAMES) -> bool:
+    matcher = ME if tuple(my_lastnames) == MY_LASTNAMES else AuthorMatcher(my_lastnames)
+    return matcher(name)
 
 def format_author_display(name: str) -> str:
     # ADS gives "Last, First Middle" → make "First Middle Last"
@@ -521,38 +1746,51 @@ def format_author_display(name: str) -> str:
         return f"{first} {last}".strip()
     return name
 
-def format_authors_html(authors):
-    """Full list; semicolon-separated; bold my name."""
-    out = []
-    for a in authors or []:
+def render_authors(authors: List[str], max_authors: int = 8, matcher: AuthorMatcher = ME) -> Dict:
+    """
+    Single pass over the author list producing authors_html (full list;
+    semicolon-separated; bold my name), authors_short_html (up to N authors;
+    always include me if present; add 'et al.'), authors_display, me_index
+    and n_authors.
+    """
+    authors = authors or []
+    display, marked = [], []
+    me_index = -1
+    for i, a in enumerate(authors):
         disp = format_author_display(a)
-        out.append(f"<strong>{disp}</strong>" if is_me(a) else disp)
-    return "; ".join(out)
+        display.append(disp)
+        if matcher(a):
+            if me_index < 0:
+                me_index = i
+            marked.append(f"<strong>{disp}</strong>")
+        else:
+            marked.append(disp)
 
-def format_authors_short_html(authors, max_authors=8):
-    """Up to N authors; always include me if present; add 'et al.'"""
-    authors = authors or []
     N = max_authors
-    total = len(authors)
-    mine_idx = next((i for i, a in enumerate(authors) if is_me(a)), None)
-
-    show = authors[:N]
-    me_included = any(is_me(a) for a in show)
-
-    etal = total > N
-    if etal and not me_included and mine_idx is not None:
+    etal = len(authors) > N
+    show = marked[:N]
+    if etal and me_index >= N:
         # Replace last slot with me so I'm visible
-        show = authors[:N-1] + [authors[mine_idx]]
+        show = marked[:N-1] + [marked[me_index]]
+    short = "; ".join(show)
+    if etal:
+        short += ", <em>et&nbsp;al.</em>"
 
-    parts = []
-    for a in show:
-        disp = format_author_display(a)
-        parts.append(f"<strong>{disp}</strong>" if is_me(a) else disp)
+    return {
+        "authors_html": "; ".join(marked),
+        "authors_short_html": short,
+        "authors_display": display,
+        "me_index": me_index,
+        "n_authors": len(authors),
+    }
 
-    s = "; ".join(parts)
-    if etal:
-        s += ", <em>et&nbsp;al.</em>"
-    return s
+def format_authors_html(authors):
+    """Full list; semicolon-separated; bold my name."""
+    return render_authors(authors)["authors_html"]
+
+def format_authors_short_html(authors, max_authors=8):
+    """Up to N authors; always include me if present; add 'et al.'"""
+    return render_authors(authors, max_authors=max_authors)["authors_short_html"]
 
 def pick_primary_url(doi: str, identifiers: list, adsurl: str) -> str:
     """Prefer publisher HTML (EDP/IOP/OUP/etc.), then DOI, else ADS. Never arXiv for the title."""
@@ -580,30 +1818,826 @@ def pick_primary_url(doi: str, identifiers: list, adsurl: str) -> str:
         return doi_url
     return adsurl
 
-def add_tags(m):
-    # robust, accent/case-insensitive thanks to your norm()
-    title = norm(m.get("title", ""))
-    journal = norm(m.get("pub", ""))  # sometimes "Sloan" appears here
+# ---- tag rules ----
+# Rules come from DEFAULT_TAGS_YML (or --tags FILE). Every keyword of every
+# rule goes into one alternation regex per field, so keywords are matched in
+# a single pass however many rules there are. Rule regexes are compiled one
+# by one: spliced into a shared pattern, inline flags ("(?i)...") and
+# numbered backreferences ("(ab)\1") would break or silently change meaning.
+
+DEFAULT_TAG_RULES = [
+    {"tag": "sdssv", "keywords": ["sdss", "sloan"], "journal": ["sdss", "sloan"]},
+    {"tag": "algols", "keywords": ["algol"]},
+    {"tag": "bbc", "keywords": ["b-type binaries"]},
+    {"tag": "bloem", "keywords": ["bloem"]},
+]
+
+def compile_rule_regex(pat: str) -> re.Pattern:
+    return re.compile(pat, re.S)
+
+class FieldMatcher:
+    """All keywords of one field in one alternation, plus the field's rule regexes."""
+
+    def __init__(self, keywords: Dict[str, set], regexes: List[Tuple[str, set]]):
+        # longest first, so the alternation reports the longest keyword at
+        # each position; the shorter keywords it starts with are folded in
+        words = sorted(keywords, key=len, reverse=True)
+        self.word_tags = {w: frozenset(t for k in words if w.startswith(k) for t in keywords[k]) for w in words}
+        self.words = re.compile("(?=(" + "|".join(map(re.escape, words)) + "))") if words else None
+        self.regexes = [(compile_rule_regex(pat), tags) for pat, tags in regexes]
+
+    def __call__(self, text: str) -> set:
+        found = set()
+        if not text:
+            return found
+        if self.words is not None:
+            for match in self.words.finditer(text):
+                found |= self.word_tags[match.group(1)]
+        for pattern, tags in self.regexes:
+            if not tags <= found and pattern.search(text):
+                found |= tags
+        return found
+
+class TagRules:
+    """Compiled tag rules: title, journal and bibcode matchers plus an author last-name table."""
+
+    def __init__(self, rules: List[Dict]):
+        self.order = list(dict.fromkeys(r["tag"] for r in rules))
+        fields = {"title": ({}, []), "pub": ({}, []), "bibcode": ({}, [])}
+        self.authors: Dict[str, set] = {}
+        for rule in rules:
+            tag = rule["tag"]
+            for kw in rule.get("keywords") or []:
+                fields["title"][0].setdefault(norm(kw), set()).add(tag)
+            for kw in rule.get("journal") or []:
+                fields["pub"][0].setdefault(norm(kw), set()).add(tag)
+            for pat in rule.get("regex") or []:
+                fields["title"][1].append((pat, {tag}))
+            for pat in rule.get("bibcode") or []:
+                fields["bibcode"][1].append((pat, {tag}))
+            for name in rule.get("authors") or []:
+                self.authors.setdefault(norm(name), set()).add(tag)
+        self.fields = {name: FieldMatcher(*spec) for name, spec in fields.items() if spec[0] or spec[1]}
+
+    @classmethod
+    def load(cls, path: Optional[str]) -> "TagRules":
+        if not path or not os.path.exists(path):
+            return cls(DEFAULT_TAG_RULES)
+        rules = (read_yaml(path) or {}).get("rules") or []
+        for rule in rules:
+            if not rule.get("tag"):
+                die(f"{path}: every rule needs a 'tag'")
+            for pat in (rule.get("regex") or []) + (rule.get("bibcode") or []):
+                try:
+                    compile_rule_regex(pat)
+                except re.error as exc:
+                    die(f"{path}: bad regex for tag '{rule['tag']}': {pat!r} ({exc})")
+        return cls(rules)
+
+    def __call__(self, m: Dict) -> List[str]:
+        found = set()
+        for field, matcher in self.fields.items():
+            text = m.get(field) or ""
+            found |= matcher(text if field == "bibcode" else norm(text))
+        if self.authors:
+            for name in m.get("authors") or []:
+                last = name.split(",")[0] if "," in name else (name.split() or [""])[-1]
+                found |= self.authors.get(norm(last), set())
+        return [t for t in self.order if t in found]
+
+TAG_RULES: Optional[TagRules] = None  # loaded lazily / in main() from --tags
+
+def tag_rules() -> TagRules:
+    global TAG_RULES
+    if TAG_RULES is None:
+        TAG_RULES = TagRules.load(DEFAULT_TAGS_YML)
+    return TAG_RULES
 
-    tags = []
-    # SDSS / Sloan
-    if "sdss" in title or "sloan" in title or "sdss" in journal or "sloan" in journal:
-        tags.append("sdssv")
-
-    # Algols
-    if "algol" in title:
-        tags.append("algols")
-
-    # B-type binaries (several phrasings)
-    if "b-type binaries" in title:
-        tags.append("bbc")
+def add_tags(m):
+    m["tags"] = tag_rules()(m)
+    return m
 
-    # Low metallicity contexts (incl. SMC/LMC mentions)
-    if "bloem" in title:
-        tags.append("bloem")
+# ---- multi-library batch mode ----
+
+@traced("sort")
+def sort_mapped(mapped: List[Dict]) -> List[Dict]:
+    # mapped.sort(key=lambda x: (x.get("year",""), x.get("bibcode","")), reverse=True)
+    mapped.sort(key=lambda x: (x.get("sortdate",""), x.get("bibcode","")), reverse=True)
+    return mapped
+
+# ---- streaming sort ----
+# The full sync never holds the whole mapped library: mapped chunks are
+# spilled to disk as sorted JSONL runs and merged back (heapq.merge) in
+# sort_mapped order while the YAML is written. Only a small per-paper
+# summary stays in memory, for views, metrics and the manifest.
+
+SUMMARY_FIELDS = ("bibcode", "year", "citations", "sortdate", "me_index", "refereed", "tags")
+
+def sort_key(m: Dict) -> Tuple[str, str]:
+    return m.get("sortdate", ""), m.get("bibcode", "")
+
+@traced("spill")
+def spill_sorted_runs(chunks: Iterable[List[Dict]], workdir: str,
+                      run_size: int = SPILL_RUN_SIZE) -> Tuple[List[str], List[Dict]]:
+    """Write mapped chunks to sorted runs of up to run_size papers; returns the run files and sorted summaries."""
+    runs: List[str] = []
+    summary: List[Dict] = []
+    buf: List[Dict] = []
+
+    def spill():
+        buf.sort(key=sort_key, reverse=True)
+        path = os.path.join(workdir, f"run{len(runs):05d}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for m in buf:
+                f.write(json.dumps(m, ensure_ascii=False, separators=(",", ":")))
+                f.write("\n")
+        runs.append(path)
+        buf.clear()
+
+    for chunk in chunks:
+        for m in chunk:
+            summary.append({k: m.get(k) for k in SUMMARY_FIELDS})
+            buf.append(m)
+            if len(buf) >= run_size:
+                spill()
+    if buf:
+        spill()
+    summary.sort(key=sort_key, reverse=True)
+    return runs, summary
+
+def read_run(path: str) -> Iterator[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+def iter_merged(runs: List[str]) -> Iterator[Dict]:
+    """All spilled papers, newest first, streamed from the sorted runs."""
+    return heapq.merge(*(read_run(p) for p in runs), key=sort_key, reverse=True)
+
+def write_tag_subset(path: str, mapped: Iterable[Dict], tag: str = "sdssv") -> int:
+    subset = [m for m in mapped if tag in (m.get("tags") or [])]
+    write_yaml(path, subset)
+    return len(subset)
+
+# ---- search index ----
+# --search-index [DIR]: a prebuilt inverted index for assets/js/pub-search.js.
+#   DIR/meta.json            counts, shard keys, stopwords
+#   DIR/terms/<key>.json     {term: [doc ids]} for every term whose search_shard_key is key
+#   DIR/docs/<block>.json    [title, authors, year, venue, url] per doc id
+# Terms are norm()-folded tokens of titles, author last names, journals, tags
+# and arXiv ids; the browser fetches meta.json, then only the term shards and
+# doc blocks a query touches. Doc ids follow the newest-first order.
+# The index is a build artifact (gitignored, rebuilt by --search-index-only
+# at site build), so its files stay out of the change manifest: writing it
+# into a fresh clone must not make a no-op refresh look like a change.
+
+SEARCH_PREFIX = 2
+SEARCH_DOC_BLOCK = 100
+SEARCH_STOPWORDS = frozenset(
+    "a an and are as at by for from in into is its of on or the to with".split()
+)
+SEARCH_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+
+def search_tokens(text: str) -> List[str]:
+    return [t for t in SEARCH_TOKEN_RE.findall(norm(text or ""))
+            if len(t) >= SEARCH_PREFIX and t not in SEARCH_STOPWORDS]
+
+def search_shard_key(term: str) -> str:
+    """First SEARCH_PREFIX characters of term without dots ("0.5" -> "05"); mirrored in pub-search.js."""
+    return term.replace(".", "")[:SEARCH_PREFIX]
+
+def paper_terms(m: Dict) -> set:
+    terms = set(search_tokens(m.get("title")))
+    for name in m.get("authors") or []:
+        terms.update(search_tokens(name.split(",")[0]))
+    terms.update(search_tokens(m.get("pub")))
+    for tag in m.get("tags") or []:
+        terms.update(search_tokens(tag))
+    if m.get("arxiv"):
+        terms.update(search_tokens(m["arxiv"]))
+    if m.get("year"):
+        terms.add(str(m["year"]))
+    return terms
+
+def search_doc(m: Dict) -> List:
+    names = m.get("authors_display") or []
+    authors = "; ".join(names[:3]) + ("; et al." if len(names) > 3 else "")
+    if m.get("pub") == "arXiv e-prints" and m.get("arxiv"):
+        venue = f"arXiv: {m['arxiv']}"
+    else:
+        venue = m.get("pub") or ""
+    return [m.get("title") or "", authors, str(m.get("year") or ""), venue, m.get("best_url") or m.get("adsurl") or ""]
+
+def write_json(path: str, data) -> bool:
+    with atomic_open(path) as f:
+        f.write(json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+    return f.changed
+
+def prune_outputs(folder: str, keep: set) -> None:
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(".json") and name not in keep:
+            os.unlink(os.path.join(folder, name))
+
+@traced("search index")
+def write_search_index(folder: str, mapped: Iterable[Dict]) -> int:
+    """Write the sharded search index for mapped (newest first); returns the number of docs."""
+    shards: Dict[str, Dict[str, List[int]]] = {}
+    blocks: List[List[List]] = []
+    n = 0
+    for n, m in enumerate(mapped, start=1):
+        doc_id = n - 1
+        if doc_id % SEARCH_DOC_BLOCK == 0:
+            blocks.append([])
+        blocks[-1].append(search_doc(m))
+        for term in paper_terms(m):
+            shards.setdefault(search_shard_key(term), {}).setdefault(term, []).append(doc_id)
+    for sub in ("terms", "docs"):
+        os.makedirs(os.path.join(folder, sub), exist_ok=True)
+    for key, terms in shards.items():
+        write_json(os.path.join(folder, "terms", f"{key}.json"), {t: terms[t] for t in sorted(terms)})
+    for k, block in enumerate(blocks):
+        write_json(os.path.join(folder, "docs", f"{k}.json"), block)
+    prune_outputs(os.path.join(folder, "terms"), {f"{key}.json" for key in shards})
+    prune_outputs(os.path.join(folder, "docs"), {f"{k}.json" for k in range(len(blocks))})
+    write_json(os.path.join(folder, "meta.json"), {
+        "count": n,
+        "prefix": SEARCH_PREFIX,
+        "block": SEARCH_DOC_BLOCK,
+        "shards": sorted(shards),
+        "stopwords": sorted(SEARCH_STOPWORDS),
+    })
+    return n
+
+# ---- publications records ----
+# Cache-dir sidecar written next to every publications output:
+#   records_<lib>.jsonl  a header line, then the full papers as JSON lines in publications order
+# --metrics-only, --incremental and the daemon load their papers from it
+# instead of parsing the YAML. The header keeps the size/mtime signature of
+# the publications output it describes; a mismatch (hand edit, other tool)
+# means the sidecar is ignored and the YAML is read instead.
+
+RECORDS_VERSION = 3
+
+def records_file(cache_dir: str, library_name: str) -> str:
+    return os.path.join(cache_dir, f"records_{norm_key(library_name)}.jsonl")
+
+def publications_signature(path: str, shards: Optional[str] = None) -> Tuple[int, int]:
+    """(total size, newest mtime_ns) of the publications output; unchanged files keep theirs (see atomic_open)."""
+    if shards:
+        paths = [e.path for e in os.scandir(shards) if e.name.endswith(".yml")] if os.path.isdir(shards) else []
+    else:
+        paths = [path] if os.path.exists(path) else []
+    stats = [os.stat(p) for p in paths]
+    return sum(st.st_size for st in stats), max((st.st_mtime_ns for st in stats), default=0)
+
+@traced("records")
+def write_records(cache_dir: str, library_name: str, mapped: Iterable[Dict],
+                  signature: Tuple[int, int]) -> int:
+    """Write the records sidecar for mapped; call after the publications output it describes."""
+    os.makedirs(cache_dir, exist_ok=True)
+    n = 0
+    with atomic_open(records_file(cache_dir, library_name)) as f:
+        f.write(json.dumps({"version": RECORDS_VERSION, "source": list(signature)}) + "\n")
+        for n, m in enumerate(mapped, start=1):
+            f.write(json.dumps(m, ensure_ascii=False, separators=(",", ":")) + "\n")
+    return n
+
+def read_records(cache_dir: str, library_name: str, signature: Tuple[int, int]) -> Optional[List[Dict]]:
+    """The papers in the records sidecar, or None when it is missing, unreadable or stale."""
+    try:
+        with open(records_file(cache_dir, library_name), "r", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if header.get("version") != RECORDS_VERSION or header.get("source") != list(signature):
+                return None
+            return [json.loads(line) for line in f]
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def load_publications(path: str, shards: Optional[str], cache_dir: str, library_name: str) -> List[Dict]:
+    """Full papers from the records sidecar when it is current, else from the YAML."""
+    records = read_records(cache_dir, library_name, publications_signature(path, shards))
+    return records if records is not None else read_publications(path, shards)
+
+# ---- raw snapshot / --rerender ----
+# Networked syncs keep the raw ADS docs and their month entries as gzipped
+# JSON lines ({"doc": ..., "month": ...} per bibcode) in the cache dir, so
+# --rerender can rebuild the _data outputs offline after a change to
+# map_doc, render_authors, pick_primary_url or the tag rules.
+
+def snapshot_file(cache_dir: str, library_name: str) -> str:
+    return os.path.join(cache_dir, f"snapshot_{norm_key(library_name)}.jsonl.gz")
+
+class SnapshotWriter:
+    """Gzipped JSON-lines writer for one snapshot; use through snapshot_writer()."""
+
+    def __init__(self, stream):
+        self.gz = gzip.GzipFile(fileobj=stream, mode="wb", mtime=0)
+        self.count = 0
+
+    def write(self, doc: Dict, month: Optional[Dict]) -> None:
+        line = json.dumps({"doc": doc, "month": month or None}, ensure_ascii=False, separators=(",", ":"))
+        self.gz.write(line.encode("utf-8") + b"\n")
+        self.count += 1
+
+    def add(self, docs: List[Dict], months: Dict[str, Dict[str, str]]):
+        """Write a fetched chunk and hand it back, so it can sit inline in a pipeline."""
+        for d in docs:
+            self.write(d, months.get(d.get("bibcode", "")))
+        return docs, months
+
+@contextmanager
+def snapshot_writer(path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with atomic_open(path) as f:
+        f.flush()
+        writer = SnapshotWriter(f.buffer)
+        yield writer
+        writer.gz.close()
+
+def iter_snapshot(path: str) -> Iterator[Tuple[Dict, Optional[Dict]]]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            entry = json.loads(line)
+            yield entry["doc"], entry.get("month")
+
+def write_snapshot(path: str, docs: List[Dict], months: Dict[str, Dict[str, str]]) -> None:
+    with snapshot_writer(path) as snap:
+        snap.add(docs, months)
+
+def update_snapshot(path: str, keep: set, citations: Dict[str, int],
+                    docs: List[Dict], months: Dict[str, Dict[str, str]]) -> None:
+    """Incremental runs: keep the entries in keep (with refreshed citation counts) and add the fetched docs."""
+    fetched = {d.get("bibcode") for d in docs}
+    with snapshot_writer(path) as snap:
+        for d, month in iter_snapshot(path):
+            b = d.get("bibcode")
+            if b in keep and b not in fetched:
+                if b in citations:
+                    d["citation_count"] = citations[b]
+                snap.write(d, month)
+        snap.add(docs, months)
+
+def rerender_chunks(path: str) -> Iterator[List[Dict]]:
+    """Mapped papers from a snapshot, a chunk at a time, without any ADS request."""
+    for block in chunked(iter_snapshot(path), BIGQUERY_CHUNK):
+        months = {d.get("bibcode", ""): month for d, month in block if month}
+        yield map_docs([d for d, _ in block], months)
+
+def resolve_delta_year(requested: Optional[int], metrics_path: Optional[str]) -> int:
+    delta_year = requested
+    if not delta_year:
+        delta_year = read_existing_delta_year(metrics_path)
+    if not delta_year:
+        delta_year = coerce_int(time.strftime("%Y"))
+    return delta_year
 
-    m["tags"] = tags
-    return m
+def write_metrics(path: str, bibs: List[str], mapped: List[Dict], delta_year: int,
+                  store_path: Optional[str] = None) -> None:
+    if store_path:
+        metrics_raw = local_metrics_raw(store_path, bibs, mapped)
+    else:
+        metrics_raw = fetch_metrics(bibs)
+    metrics_payload = build_metrics_payload(metrics_raw, mapped, delta_year=delta_year)
+    existing = read_yaml(path) if os.path.exists(path) else None
+    if MANIFEST is not None:
+        MANIFEST.metrics_diff(path, existing, metrics_payload)
+    # as_of moves every day; keep the old file (and date) when nothing else did
+    if isinstance(existing, dict) and {**existing, "as_of": None} == {**metrics_payload, "as_of": None}:
+        if MANIFEST is not None:
+            MANIFEST.output(path, file_sha256(path), False)
+        print(f"Metrics unchanged; kept {path} (as_of {existing.get('as_of')})")
+        return
+    write_yaml(path, metrics_payload)
+    print(f"Wrote metrics to {path}")
+
+# ---- metrics history ----
+# Opt-in (--history-dir). One JSON line per run that changed something, in DIR/<library>.jsonl:
+#   {"date": ..., "add": [new bibcodes], "idx": [column], "delta": [citation change], "metrics": {...}}
+# Bibcodes are columns in order of first appearance; each line only carries
+# the citation changes since the previous line (a paper that leaves the
+# library drops to 0). Queries replay the deltas, no ADS calls involved.
+# The headline metrics are always computed from the papers themselves, so
+# runs with and without --metrics / --local-metrics stay comparable.
+
+HEADLINE_METRICS = ("total_papers", "total_citations", "h_index", "g_index")
+
+def history_file(history_dir: str, library_name: str) -> str:
+    return os.path.join(history_dir, f"{norm_key(library_name)}.jsonl")
+
+def headline_metrics(mapped: List[Dict]) -> Dict[str, int]:
+    counts = [coerce_int(m.get("citations")) for m in mapped]
+    return {"total_papers": len(counts), "total_citations": sum(counts),
+            "h_index": compute_h_index(counts), "g_index": compute_g_index(counts)}
+
+class MetricsHistory:
+    """Append-only, delta-encoded history of per-paper citations and headline metrics."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.bibcodes: List[str] = []
+        self.column: Dict[str, int] = {}
+        self.lines: List[Dict] = []
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._apply(json.loads(line))
+
+    def _apply(self, entry: Dict) -> None:
+        for b in entry.get("add") or []:
+            self.column[b] = len(self.bibcodes)
+            self.bibcodes.append(b)
+        self.lines.append(entry)
+
+    def replay(self, until: Optional[str] = None) -> List[int]:
+        """Citations per column as of the last line dated <= until."""
+        counts = [0] * len(self.bibcodes)
+        for entry in self.lines:
+            if until is not None and entry["date"] > until:
+                break
+            for i, d in zip(entry["idx"], entry["delta"]):
+                counts[i] += d
+        return counts
+
+    def metrics_at(self, until: Optional[str] = None) -> Dict[str, int]:
+        found = {}
+        for entry in self.lines:
+            if until is not None and entry["date"] > until:
+                break
+            found = entry.get("metrics") or found
+        return found
+
+    def append(self, date: str, citations: Dict[str, int], metrics: Dict[str, int]) -> bool:
+        """Record today's state; returns False (and writes nothing) if nothing moved since the last line."""
+        current = self.replay()
+        add = [b for b in citations if b not in self.column]
+        new_columns = {b: len(self.bibcodes) + k for k, b in enumerate(add)}
+        idx, delta = [], []
+        for b, c in citations.items():
+            i = self.column[b] if b in self.column else new_columns[b]
+            old = current[i] if i < len(current) else 0
+            if c != old:
+                idx.append(i)
+                delta.append(c - old)
+        for b, i in self.column.items():
+            if b not in citations and current[i]:
+                idx.append(i)
+                delta.append(-current[i])
+        if not add and not idx and metrics == self.metrics_at():
+            return False
+        entry = {"date": date, "add": add, "idx": idx, "delta": delta, "metrics": metrics}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._apply(entry)
+        return True
+
+    def baseline(self, date: str) -> str:
+        """date, or the first snapshot's date if the history starts later (there is nothing to measure from before it)."""
+        if self.lines and date < self.lines[0]["date"]:
+            return self.lines[0]["date"]
+        return date
+
+    def gained_since(self, date: str) -> Dict[str, int]:
+        then = self.replay(until=self.baseline(date))
+        now = self.replay()
+        return {b: now[i] - then[i] for i, b in enumerate(self.bibcodes) if now[i] != then[i]}
+
+    def window(self, start: str, end: str) -> Dict[str, List[int]]:
+        a, b = self.metrics_at(until=self.baseline(start)), self.metrics_at(until=self.baseline(end))
+        return {k: [a.get(k, 0), b.get(k, 0), b.get(k, 0) - a.get(k, 0)] for k in HEADLINE_METRICS}
+
+    def growth(self, days: int = 365) -> List[Tuple[str, int, float]]:
+        """
+        (bibcode, citations gained, citations per year) over the last days;
+        papers first recorded later are measured from their first snapshot.
+        """
+        start = time.strftime("%Y-%m-%d", time.localtime(time.time() - days * 86400))
+        counts = [0] * len(self.bibcodes)
+        base: List[Optional[Tuple[str, int]]] = [None] * len(self.bibcodes)   # (date, citations) to measure from
+        present: List[int] = []
+        last = start
+        for entry in self.lines:
+            if entry["date"] > start and last <= start:       # first line inside the window
+                for i in present:
+                    base[i] = (start, counts[i])
+            for i, d in zip(entry["idx"], entry["delta"]):
+                counts[i] += d
+            added = [self.column[b] for b in entry.get("add") or []]
+            present.extend(added)
+            if entry["date"] > start:
+                for i in added:
+                    base[i] = (entry["date"], counts[i])
+            last = entry["date"]
+        if last <= start:
+            return []
+        out = []
+        for i, b in enumerate(self.bibcodes):
+            if base[i] is None:
+                continue
+            since, then = base[i]
+            years = (time.mktime(time.strptime(last, "%Y-%m-%d"))
+                     - time.mktime(time.strptime(since, "%Y-%m-%d"))) / (365.25 * 86400)
+            gained = counts[i] - then
+            out.append((b, gained, gained / years if years > 0 else 0.0))
+        return sorted(out, key=lambda x: x[2], reverse=True)
+
+def record_history(history_dir: Optional[str], library_name: str, mapped: List[Dict]) -> None:
+    if not history_dir:
+        return
+    history = MetricsHistory(history_file(history_dir, library_name))
+    citations = {m["bibcode"]: coerce_int(m.get("citations")) for m in mapped if m.get("bibcode")}
+    if history.append(time.strftime("%Y-%m-%d"), citations, headline_metrics(mapped)):
+        print(f"Recorded metrics history in {history.path}")
+
+def print_history_report(args) -> None:
+    history = MetricsHistory(history_file(args.history_dir or DEFAULT_HISTORY_DIR, args.library_name))
+    if not history.lines:
+        die(f"No metrics history in {history.path}")
+    print(f"{history.path}: {len(history.lines)} snapshots, "
+          f"{history.lines[0]['date']} .. {history.lines[-1]['date']}, {len(history.bibcodes)} papers")
+    if args.history_since:
+        gained = history.gained_since(args.history_since)
+        since = history.baseline(args.history_since)
+        if since != args.history_since:
+            print(f"No snapshot before {since}; there is no earlier baseline, measuring from it.")
+        print(f"Citations gained since {since}: {sum(gained.values())}")
+        for b, n in sorted(gained.items(), key=lambda x: x[1], reverse=True)[:args.history_top]:
+            print(f"  {n:>+6}  {b}")
+    if args.history_window:
+        start, end = args.history_window
+        if history.baseline(start) != start:
+            print(f"No snapshot before {history.baseline(start)}; there is no earlier baseline, measuring from it.")
+            start = history.baseline(start)
+        print(f"Metrics {start} -> {end}:")
+        for k, (a, b, d) in history.window(start, end).items():
+            print(f"  {k:<16} {a:>6} -> {b:>6}  ({d:+d})")
+    if args.history_growth:
+        print(f"Citation growth over the last {args.history_growth} days (citations/year):")
+        for b, gained, rate in history.growth(args.history_growth)[:args.history_top]:
+            print(f"  {rate:>8.1f}  {gained:>+6}  {b}")
+
+def load_batch_config(path: str) -> List[Dict]:
+    """
+    Batch config (YAML):
+      libraries:
+        - name: JIV
+          out_all: _data/papers_all.yml
+          metrics: _data/ads_metrics.yml     # optional
+          compact: false                     # optional, see --compact
+          shards: _data/papers               # optional, see --shards
+          search_index: assets/search        # optional, see --search-index
+          tags:                              # optional tag -> subset YAML
+            sdssv: _data/papers_sdssv.yml
+    """
+    cfg = read_yaml(path) or {}
+    libs = cfg.get("libraries") or []
+    for lib in libs:
+        if not lib.get("name") or not lib.get("out_all"):
+            die(f"{path}: every library needs 'name' and 'out_all'")
+    if not libs:
+        die(f"{path}: no libraries configured")
+    return libs
+
+def sync_batch(config_path: str, delta_year: Optional[int] = None, store_dir: Optional[str] = None,
+               snapshot_dir: str = DEFAULT_CACHE_DIR, rerender: bool = False,
+               history_dir: Optional[str] = None) -> None:
+    """
+    Sync several libraries at once: collect all bibcodes first, fetch each
+    unique bibcode's metadata and month exactly once, then map and write
+    every library's outputs in parallel.
+    """
+    libs = load_batch_config(config_path)
+
+    def write_outputs(cfg: Dict, mapped: List[Dict]) -> None:
+        write_publications(cfg["out_all"], mapped, compact=bool(cfg.get("compact")), shards=cfg.get("shards"))
+        write_records(snapshot_dir, cfg["name"], mapped, publications_signature(cfg["out_all"], cfg.get("shards")))
+        print(f"[{cfg['name']}] Wrote {len(mapped)} items to {cfg.get('shards') or cfg['out_all']}")
+        for tag, path in (cfg.get("tags") or {}).items():
+            n = write_tag_subset(path, mapped, tag)
+            print(f"[{cfg['name']}] Wrote {n} '{tag}' items to {path}")
+        if cfg.get("search_index"):
+            write_search_index(cfg["search_index"], mapped)
+            print(f"[{cfg['name']}] Wrote search index to {cfg['search_index']}")
+
+    if rerender:
+        def rerender_one(cfg: Dict) -> None:
+            path = snapshot_file(snapshot_dir, cfg["name"])
+            if not os.path.exists(path):
+                die(f"No snapshot for {cfg['name']} ({path}); run a networked sync first.")
+            write_outputs(cfg, sort_mapped([m for chunk in rerender_chunks(path) for m in chunk]))
+        run_chunks(rerender_one, libs)
+        return
+
+    ids = {lib.get("name"): lib.get("id") for lib in iter_libraries()}
+    missing = [c["name"] for c in libs if c["name"] not in ids]
+    if missing:
+        die(f'Libraries not found: {", ".join(missing)}. Available: {", ".join(ids)}')
+
+    bibs_by_lib = dict(zip(
+        (c["name"] for c in libs),
+        run_chunks(get_bibcodes_for_library, [ids[c["name"]] for c in libs]),
+    ))
+    unique = list(dict.fromkeys(b for bibs in bibs_by_lib.values() for b in bibs))
+    total = sum(len(b) for b in bibs_by_lib.values())
+    print(f"Batch: {len(libs)} libraries, {total} bibcodes, {len(unique)} unique")
+
+    docs, months = fetch_docs_and_months(unique)
+    docs_by_code = index_docs(docs)
+
+    def sync_one(cfg: Dict) -> None:
+        bibs = bibs_by_lib[cfg["name"]]
+        lib_docs, seen, misses = [], set(), []
+        for b in bibs:
+            d = docs_by_code.get(b)
+            if d is None:
+                misses.append(b)
+            elif d.get("bibcode") not in seen:      # two library entries can resolve to one paper
+                seen.add(d.get("bibcode"))
+                lib_docs.append(d)
+        if misses:
+            print(f"[{cfg['name']}] {len(misses)} bibcodes not returned by ADS: {', '.join(misses)}", file=sys.stderr)
+        write_snapshot(snapshot_file(snapshot_dir, cfg["name"]), lib_docs, months)
+        mapped = sort_mapped(map_docs(lib_docs, months))
+        write_outputs(cfg, mapped)
+        if cfg.get("metrics"):
+            store_path = os.path.join(store_dir, f"metrics_store_{norm_key(cfg['name'])}.json") if store_dir else None
+            write_metrics(cfg["metrics"], bibs, mapped, resolve_delta_year(delta_year, cfg["metrics"]), store_path)
+        record_history(history_dir, cfg["name"], mapped)
+
+    run_chunks(sync_one, libs)
+
+# ---- daemon mode ----
+# --daemon keeps the mapped library in memory and refreshes it by tier
+# instead of re-fetching everything:
+#   recent     every hour: new/removed bibcodes, citation counts of papers
+#              from the last RECENT_YEARS years, and a rotating slice of the
+#              older papers sized so each is refreshed once per "old" period
+#   preprints  daily: arXiv-to-refereed promotion checks and metrics
+# _data files are only rewritten when a tier changed something.
+
+DAEMON_TIERS = {"recent": 3600, "preprints": 86400, "old": 7 * 86400}
+DAEMON_RETRY = 300  # seconds before retrying a tier whose ADS requests failed
+RECENT_YEARS = 2
+
+def fetch_citation_counts(bibcodes: List[str]) -> Dict[str, int]:
+    docs = fetch_metadata_for_bibcodes(bibcodes, ["bibcode", "citation_count"])
+    return {d.get("bibcode", ""): coerce_int(d.get("citation_count")) for d in docs}
+
+class LibraryDaemon:
+    """Mapped library held in memory, refreshed tier by tier on a fixed schedule."""
+
+    def __init__(self, args, library_id: str):
+        self.library_id = library_id
+        self.out_all = args.out_all
+        self.out_metrics = args.metrics
+        self.compact = args.compact
+        self.shards = args.shards
+        self.search_index = args.search_index
+        self.cache_dir = args.cache_dir
+        self.store_path = os.path.join(args.cache_dir, METRICS_STORE_NAME) if args.local_metrics else None
+        self.delta_year = resolve_delta_year(args.delta_year, args.metrics)
+        self.library_name = args.library_name
+        self.history_dir = args.history_dir
+        self.papers: Dict[str, Dict] = {}
+        self.aliases: Dict[str, str] = {}   # library bibcode -> bibcode ADS now files it under
+        self.old_cursor = 0
+        self.next_due = {"recent": 0.0, "preprints": 0.0}
+        self.dirty = False          # publications need writing
+        self.metrics_due = False    # metrics need refetching
+
+    def log(self, msg: str) -> None:
+        print(f"[daemon {time.strftime('%Y-%m-%d %H:%M:%S')}] {msg}", flush=True)
+
+    def load(self) -> None:
+        if publications_exist(self.out_all, self.shards):
+            mapped = load_publications(self.out_all, self.shards, self.cache_dir, self.library_name)
+            # the preprint tier's first run picks up anything that moved meanwhile
+            self.next_due["preprints"] = time.time() + DAEMON_TIERS["recent"]
+        else:
+            mapped = map_docs(*fetch_docs_and_months(get_bibcodes_for_library(self.library_id)))
+            self.dirty = self.metrics_due = True
+        self.papers = {m["bibcode"]: m for m in mapped if m.get("bibcode")}
+        self.log(f"loaded {len(self.papers)} papers")
+
+    def is_recent(self, m: Dict) -> bool:
+        return coerce_int(m.get("year")) > int(time.strftime("%Y")) - RECENT_YEARS
+
+    def old_slice(self) -> List[str]:
+        old = sorted(b for b, m in self.papers.items() if not self.is_recent(m))
+        if not old:
+            return []
+        n = min(len(old), math.ceil(len(old) * DAEMON_TIERS["recent"] / DAEMON_TIERS["old"]))
+        start = self.old_cursor % len(old)
+        self.old_cursor = start + n
+        return (old + old)[start:start + n]
+
+    def fetch_papers(self, bibs: List[str]) -> Dict[str, Dict]:
+        """
+        Fresh papers for bibs, keyed by the requested bibcode. A paper ADS has
+        since canonicalized (arXiv -> journal) comes back under its new
+        bibcode, and the old one is remembered in self.aliases; bibcodes ADS
+        did not return are left out and logged.
+        """
+        docs, months = fetch_docs_and_months(bibs)
+        mapped = dict(zip((d.get("bibcode") for d in docs), map_docs(docs, months)))
+        by_code = index_docs(docs)
+        out: Dict[str, Dict] = {}
+        for b in bibs:
+            d = by_code.get(b)
+            if d is None:
+                continue
+            if d.get("bibcode") != b:
+                self.aliases[b] = d.get("bibcode")
+            out[b] = mapped[d.get("bibcode")]
+        if len(out) < len(bibs):
+            self.log(f"{len(bibs) - len(out)} bibcodes not returned by ADS: "
+                     f"{', '.join(b for b in bibs if b not in out)}")
+        return out
+
+    def update_citations(self, counts: Dict[str, int]) -> int:
+        changed = 0
+        for b, c in counts.items():
+            m = self.papers.get(b)
+            if m is not None and coerce_int(m.get("citations")) != c:
+                m["citations"] = c
+                changed += 1
+        return changed
+
+    def refresh_recent(self) -> bool:
+        bibs = get_bibcodes_for_library(self.library_id)
+        added = [b for b in bibs if self.aliases.get(b, b) not in self.papers]
+        fresh = self.fetch_papers(added) if added else {}
+        for m in fresh.values():
+            self.papers[m["bibcode"]] = m
+        current = {self.aliases.get(b, b) for b in bibs}     # after fetch_papers learned new aliases
+        removed = [b for b in self.papers if b not in current]
+        for b in removed:
+            del self.papers[b]
+        new_keys = {m["bibcode"] for m in fresh.values()}
+        targets = [b for b, m in self.papers.items() if self.is_recent(m) and b not in new_keys]
+        targets += self.old_slice()
+        changed = self.update_citations(fetch_citation_counts(targets)) if targets else 0
+        self.log(f"recent: {len(fresh)} new, {len(removed)} removed, "
+                 f"{changed}/{len(targets)} citation counts changed")
+        if fresh or removed:
+            self.metrics_due = True
+        return bool(fresh or removed or changed)
+
+    def refresh_preprints(self) -> bool:
+        recheck = [b for b, m in self.papers.items() if not m.get("refereed")]
+        fresh = self.fetch_papers(recheck) if recheck else {}
+        changed = []
+        for b, m in fresh.items():
+            if m["bibcode"] != b:       # filed under its journal bibcode now; drop the arXiv key
+                del self.papers[b]
+            if m != self.papers.get(m["bibcode"]):
+                self.papers[m["bibcode"]] = m
+                changed.append(m)
+        promoted = sum(1 for m in changed if m.get("refereed"))
+        self.log(f"preprints: {len(recheck)} rechecked, {len(changed)} updated, {promoted} now refereed")
+        self.metrics_due = True
+        return bool(changed)
+
+    def flush(self) -> None:
+        if not (self.dirty or (self.metrics_due and self.out_metrics)):
+            return
+        mapped = sort_mapped(list(self.papers.values()))
+        if self.dirty:
+            write_publications(self.out_all, mapped, compact=self.compact, shards=self.shards)
+            write_records(self.cache_dir, self.library_name, mapped, publications_signature(self.out_all, self.shards))
+            if self.search_index:
+                write_search_index(self.search_index, mapped)
+            self.log(f"wrote {len(mapped)} items to {self.shards or self.out_all}")
+            self.dirty = False
+        if self.metrics_due and self.out_metrics:
+            bibs = [m["bibcode"] for m in mapped]
+            try:
+                write_metrics(self.out_metrics, bibs, mapped, self.delta_year, self.store_path)
+            except SystemExit as exc:   # fetch_metrics gave up; try again next tick
+                self.log(str(exc))
+                return
+            record_history(self.history_dir, self.library_name, mapped)
+        elif not self.out_metrics:
+            record_history(self.history_dir, self.library_name, mapped)
+        self.metrics_due = False
+
+    def run(self) -> None:
+        self.load()
+        while True:
+            for tier, refresh in (("recent", self.refresh_recent), ("preprints", self.refresh_preprints)):
+                now = time.time()
+                if now < self.next_due[tier]:
+                    continue
+                try:
+                    self.dirty |= refresh()
+                    self.next_due[tier] = now + DAEMON_TIERS[tier]
+                except (requests.exceptions.RequestException, SystemExit) as exc:
+                    # SystemExit: the biblib listing gives up with a message after its retries
+                    self.log(f"{tier} refresh failed ({exc}); retrying in {DAEMON_RETRY}s")
+                    self.next_due[tier] = now + DAEMON_RETRY
+            self.flush()
+            time.sleep(max(min(self.next_due.values()) - time.time(), 1))
 
 def parse_args():
     parser = argparse.ArgumentParser(
@@ -629,6 +2663,20 @@ def parse_args():
         metavar="PATH",
         help=f"Optional SDSS subset output (default: {DEFAULT_SDSS_YML})",
     )
+    parser.add_argument(
+        "--search-index",
+        nargs="?",
+        const=DEFAULT_SEARCH_DIR,
+        default=None,
+        metavar="DIR",
+        help=f"Also write the sharded publication search index for assets/js/pub-search.js (default: {DEFAULT_SEARCH_DIR})",
+    )
+    parser.add_argument(
+        "--search-index-only",
+        action="store_true",
+        help="Offline: rebuild the --search-index from the existing publications output and exit "
+             "(used by the site build; the index is not committed).",
+    )
     parser.add_argument(
         "--metrics",
         nargs="?",
@@ -648,65 +2696,293 @@ def parse_args():
         action="store_true",
         help="Only refresh metrics using an existing publications file.",
     )
+    parser.add_argument(
+        "--batch",
+        default=None,
+        metavar="CONFIG",
+        help="Sync every library listed in a YAML config, fetching shared bibcodes once.",
+    )
+    parser.add_argument(
+        "--tags",
+        metavar="FILE",
+        default=DEFAULT_TAGS_YML,
+        help="YAML tag rules (default: scripts/ads_tags.yml; built-in rules if missing).",
+    )
+    parser.add_argument(
+        "--run-dir",
+        metavar="DIR",
+        help=f"Journal completed stages/chunks to DIR so a failed run can be resumed "
+             f"(default with --resume: {DEFAULT_RUN_DIR}); removed after a successful run.",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue from the checkpoints left in --run-dir by a failed run.",
+    )
+    parser.add_argument(
+        "--manifest",
+        metavar="FILE",
+        help="Write a JSON change manifest (added/removed bibcodes, citation changes, "
+             "metric deltas, output hashes) to FILE.",
+    )
+    parser.add_argument(
+        "--local-metrics",
+        action="store_true",
+        help="Compute metrics locally from per-paper citations (kept in the cache dir); "
+             "/metrics is only called for reads, and skipped when citation counts are unchanged.",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Write publications in the compact format (interned author table in <out_all>_authors.yml).",
+    )
+    parser.add_argument(
+        "--shards",
+        nargs="?",
+        const=DEFAULT_SHARDS_DIR,
+        metavar="DIR",
+        help=f"Write publications as per-year shards DIR/<year>.yml plus DIR/{SHARD_INDEX} instead of "
+             f"<out_all>; unchanged shards are not rewritten (default DIR: {DEFAULT_SHARDS_DIR}).",
+    )
+    parser.add_argument(
+        "--history-dir",
+        metavar="DIR",
+        help=f"Append per-paper citations and headline metrics to DIR/<library>.jsonl after each run "
+             f"(off by default; the history queries read {DEFAULT_HISTORY_DIR} unless given).",
+    )
+    parser.add_argument(
+        "--history-since",
+        metavar="DATE",
+        help="Offline query: citations gained since DATE (YYYY-MM-DD), total and per paper.",
+    )
+    parser.add_argument(
+        "--history-window",
+        nargs=2,
+        metavar=("FROM", "TO"),
+        help="Offline query: headline metric changes between two dates.",
+    )
+    parser.add_argument(
+        "--history-growth",
+        nargs="?",
+        const=365,
+        type=int,
+        metavar="DAYS",
+        help="Offline query: per-paper citation growth rate over the last DAYS (default: 365).",
+    )
+    parser.add_argument(
+        "--history-top",
+        type=int,
+        default=10,
+        help="Rows shown by the per-paper history queries (default: 10).",
+    )
+    parser.add_argument(
+        "--rerender",
+        action="store_true",
+        help="Rebuild the publication outputs from the raw ADS snapshot in the cache dir, without network access.",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep running and refresh by tier (recent papers hourly, preprints and metrics daily, "
+             "old papers over a week); outputs are rewritten only when something changed.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Reuse the existing publications file; fetch only new/changed bibcodes and refresh citations.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        metavar="N",
+        help=f"Max ADS requests in flight for chunked stages (default: {DEFAULT_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print a per-stage / per-endpoint timing summary at the end of the run.",
+    )
+    parser.add_argument(
+        "--trace",
+        default=None,
+        metavar="FILE",
+        help="Write a Chrome-trace/Perfetto JSON of every stage and HTTP request.",
+    )
+    parser.add_argument(
+        "--cprofile",
+        default=None,
+        metavar="FILE",
+        help="cProfile the mapping stage and dump pstats to FILE.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        metavar="DIR",
+        help=f"Directory for the on-disk ADS response cache (default: {DEFAULT_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write the ADS response cache.",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore cached responses but store the fresh ones.",
+    )
     return parser.parse_args()
 
 def main():
-    if not TOKEN:
+    args = parse_args()
+    offline = (args.rerender or args.search_index_only
+               or args.history_since or args.history_window or args.history_growth)
+    if not TOKEN and not offline:
         die("ADS_DEV_KEY is not set in environment.")
 
-    args = parse_args()
+    global CACHE, CONCURRENCY, TRANSPORT, TRACER, MANIFEST, TAG_RULES, JOURNAL
+    CONCURRENCY = max(args.concurrency, 1)
+    TRANSPORT = AdsTransport(pool_size=CONCURRENCY)
+    if not (args.no_cache or offline):
+        # the daemon always wants fresh answers but keeps the cache warm for one-shot runs
+        CACHE = ResponseCache(args.cache_dir, refresh=args.refresh or args.daemon)
+    if args.profile or args.trace or args.cprofile:
+        TRACER = Tracer(cprofile_path=args.cprofile)
+    if args.manifest:
+        MANIFEST = Manifest()
+    if args.tags != DEFAULT_TAGS_YML and not os.path.exists(args.tags):
+        die(f"Tag rules file not found: {args.tags}")
+    TAG_RULES = TagRules.load(args.tags)
+    if (args.run_dir or args.resume) and not args.daemon:
+        JOURNAL = RunJournal(args.run_dir or DEFAULT_RUN_DIR, resume=args.resume)
+        if args.resume:
+            print(f"Resuming from {JOURNAL.run_dir}: {JOURNAL.summary()}")
+
+    try:
+        run_sync(args)
+        if JOURNAL is not None:
+            JOURNAL.finish()
+        if MANIFEST is not None:
+            MANIFEST.write(args.manifest)
+            print(f"Wrote change manifest to {args.manifest}")
+    finally:
+        print(TRANSPORT.summary())
+        if TRACER is not None:
+            if args.profile:
+                print(TRACER.summary())
+            if args.trace:
+                TRACER.write_chrome_trace(args.trace)
+                print(f"Wrote trace to {args.trace}")
+            if args.cprofile:
+                TRACER.write_cprofile()
+                print(f"Wrote cProfile stats to {args.cprofile}")
+
+def run_sync(args):
     library_name = args.library_name
     out_all = args.out_all
+    shards = args.shards
     out_sdss = args.sdss
     out_metrics = args.metrics
     metrics_only = args.metrics_only
 
+    if args.daemon:
+        if args.batch or metrics_only:
+            die("--daemon works on a single library; it cannot be combined with --batch or --metrics-only.")
+        try:
+            LibraryDaemon(args, find_library_id(library_name)).run()
+        except KeyboardInterrupt:
+            print("Daemon stopped.")
+        return
+
+    if args.batch:
+        sync_batch(args.batch, delta_year=args.delta_year,
+                   store_dir=args.cache_dir if args.local_metrics else None,
+                   snapshot_dir=args.cache_dir, rerender=args.rerender, history_dir=args.history_dir)
+        return
+
+    if args.history_since or args.history_window or args.history_growth:
+        print_history_report(args)
+        return
+
+    if args.search_index_only:
+        folder = args.search_index or DEFAULT_SEARCH_DIR
+        if not publications_exist(out_all, shards):
+            die(f"{shards or out_all} not found; run a sync first.")
+        n = write_search_index(folder, read_publications(out_all, shards))
+        print(f"Wrote search index for {n} items to {folder}")
+        return
+
+    snapshot = snapshot_file(args.cache_dir, library_name)
+    if args.rerender:
+        if not os.path.exists(snapshot):
+            die(f"No snapshot for {library_name} ({snapshot}); run a networked sync first.")
+        with tempfile.TemporaryDirectory(prefix="ads_sync_") as workdir:
+            runs, mapped = spill_sorted_runs(rerender_chunks(snapshot), workdir)
+            write_publications(out_all, iter_merged(runs), compact=args.compact, summary=mapped, shards=shards)
+            write_records(args.cache_dir, library_name, iter_merged(runs), publications_signature(out_all, shards))
+            if out_sdss:
+                n = write_tag_subset(out_sdss, iter_merged(runs))
+                print(f"Wrote {n} SDSS/Sloan items to {out_sdss}")
+            if args.search_index:
+                n = write_search_index(args.search_index, iter_merged(runs))
+                print(f"Wrote search index for {n} items to {args.search_index}")
+        print(f"Re-rendered {len(mapped)} items from {snapshot} to {shards or out_all}")
+        if out_metrics:
+            print("Metrics need ADS; left unchanged by --rerender.")
+        return
+
     if metrics_only and not out_metrics:
         out_metrics = DEFAULT_METRICS_YML
-    delta_year = args.delta_year
-    if not delta_year:
-        delta_year = read_existing_delta_year(out_metrics)
-    if not delta_year:
-        delta_year = coerce_int(time.strftime("%Y"))
+    delta_year = resolve_delta_year(args.delta_year, out_metrics)
 
     if metrics_only:
-        if not os.path.exists(out_all):
-            die(f"{out_all} not found; run without --metrics-only first.")
-        with open(out_all, "r", encoding="utf-8") as f:
-            mapped = yaml.safe_load(f) or []
+        if not publications_exist(out_all, shards):
+            die(f"{shards or out_all} not found; run without --metrics-only first.")
+        mapped = load_publications(out_all, shards, args.cache_dir, library_name)
         bibs = [m.get("bibcode") for m in mapped if m.get("bibcode")]
     else:
         lib_id = find_library_id(library_name)
-        bibs = get_bibcodes_for_library(lib_id)
-        if not bibs:
-            die("No bibcodes found in library.")
-
-        docs = fetch_metadata_for_bibcodes(bibs)
-
-        # Build a month map from BibTeX for refereed, non-arXiv items
-        ref_bibcodes = [d.get("bibcode","") for d in docs
-                        if d.get("pub") != "arXiv e-prints" and "REFEREED" in (d.get("property") or [])]
-        global BIBTEX_MONTH_BY_BIBCODE
-        BIBTEX_MONTH_BY_BIBCODE = fetch_bibtex_months(ref_bibcodes)
-
-        mapped = [map_doc(d) for d in docs]
-        mapped = [add_tags(m) for m in mapped]         # keep your tagging step
-        # mapped.sort(key=lambda x: (x.get("year",""), x.get("bibcode","")), reverse=True)
-        mapped.sort(key=lambda x: (x.get("sortdate",""), x.get("bibcode","")), reverse=True)
-
-        write_yaml(out_all, mapped)
-        print(f"Wrote {len(mapped)} items to {out_all}")
+        if args.incremental and publications_exist(out_all, shards):
+            bibs = get_bibcodes_for_library(lib_id)
+            if not bibs:
+                die("No bibcodes found in library.")
+            old = load_publications(out_all, shards, args.cache_dir, library_name)
+            mapped = sort_mapped(sync_incremental(lib_id, bibs, old, snapshot))
+            write_publications(out_all, mapped, compact=args.compact, shards=shards)
+            write_records(args.cache_dir, library_name, mapped, publications_signature(out_all, shards))
+            if out_sdss:
+                n = write_tag_subset(out_sdss, mapped)
+                print(f"Wrote {n} SDSS/Sloan items to {out_sdss}")
+            if args.search_index:
+                n = write_search_index(args.search_index, mapped)
+                print(f"Wrote search index for {n} items to {args.search_index}")
+        else:
+            # library pages -> metadata/month chunks -> map -> sorted runs -> merged write
+            if JOURNAL is not None:
+                bibs = get_bibcodes_for_library(lib_id)   # journaled runs take the list as one checkpoint
+                source = bibs
+            else:
+                bibs = []
+                source = recorded(iter_library_bibcodes(lib_id), bibs)
+            with snapshot_writer(snapshot) as snap, tempfile.TemporaryDirectory(prefix="ads_sync_") as workdir:
+                chunks = (map_docs(*snap.add(docs, months)) for docs, months in iter_docs_and_months(source))
+                runs, mapped = spill_sorted_runs(chunks, workdir)
+                if not bibs:
+                    die("No bibcodes found in library.")
+                write_publications(out_all, iter_merged(runs), compact=args.compact, summary=mapped, shards=shards)
+                write_records(args.cache_dir, library_name, iter_merged(runs), publications_signature(out_all, shards))
+                if out_sdss:
+                    n = write_tag_subset(out_sdss, iter_merged(runs))
+                    print(f"Wrote {n} SDSS/Sloan items to {out_sdss}")
+                if args.search_index:
+                    n = write_search_index(args.search_index, iter_merged(runs))
+                    print(f"Wrote search index for {n} items to {args.search_index}")
+        print(f"Wrote {len(mapped)} items to {shards or out_all}")
 
     if out_metrics:
-        metrics_raw = fetch_metrics(bibs)
-        metrics_payload = build_metrics_payload(metrics_raw, mapped, delta_year=delta_year)
-        write_yaml(out_metrics, metrics_payload)
-        print(f"Wrote metrics to {out_metrics}")
-
-    # if out_sdss:
-    #     filtered = [m for m in mapped if "sdssv" in (m.get("tags") or [])]
-    #     write_yaml(out_sdss, filtered)
-    #     print(f"Wrote {len(filtered)} SDSS/Sloan items to {out_sdss}")
+        store_path = os.path.join(args.cache_dir, METRICS_STORE_NAME) if args.local_metrics else None
+        write_metrics(out_metrics, bibs, mapped, delta_year, store_path)
+    record_history(args.history_dir, library_name, mapped)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,18 @@
+# Shared fake ADS records for the tests.
+
+ME_ADS = "Villaseñor, Jaime I."
+
+
+def names(n, prefix="Author"):
+    return [f"{prefix}{i}, A. B." for i in range(n)]
+
+
+def doc(bibcode, authors=(), year="2024", citations=3, refereed=True, title="A title", aliases=()):
+    """An ADS search doc as fetch_metadata_chunk returns it; aliases go into identifier."""
+    return {
+        "bibcode": bibcode, "title": [title], "author": list(authors), "year": year,
+        "pub": "The Astrophysical Journal" if refereed else "arXiv e-prints",
+        "volume": "900", "page": ["12"], "doi": [f"10.3847/{bibcode}"],
+        "identifier": [bibcode, *aliases, "arXiv:2401.01234"], "citation_count": citations,
+        "pubdate": f"{year}-03-00", "property": ["REFEREED"] if refereed else [],
+    }
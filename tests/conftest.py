@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts")
+sys.path.insert(0, SCRIPTS)
+sys.path.insert(0, os.path.join(SCRIPTS, "bench"))
+
+import update_ads_pubs as ads  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def no_run_state(monkeypatch):
+    """Every test starts without the globals main() sets up."""
+    for name in ("CACHE", "MANIFEST", "JOURNAL", "TRACER"):
+        monkeypatch.setattr(ads, name, None)
@@ -0,0 +1,34 @@
+# Single-pass author rendering against the legacy renderer kept in scripts/bench/bench_authors.py.
+import pytest
+
+import update_ads_pubs as ads
+from ads_fakes import ME_ADS, names
+from bench_authors import legacy_render
+
+
+@pytest.mark.parametrize("authors", [
+    [],
+    [ME_ADS],
+    names(3) + [ME_ADS],
+    names(7) + [ME_ADS] + names(1, "Late"),             # me in the last visible slot
+    names(12) + [ME_ADS] + names(5, "Late"),            # me hidden behind et al.
+    names(20),                                          # et al. without me
+    [ME_ADS] + names(4) + ["Villasenor, J."],           # me twice, unaccented spelling
+    ["Jaime Villaseñor", "Ana Smith"],                  # no comma
+    ["Smith, John, Jr.", "de la Cruz, María"] + names(8),
+])
+def test_render_authors_matches_legacy(authors):
+    assert ads.render_authors(authors) == legacy_render(authors)
+
+
+def test_render_authors_short_limit_matches_legacy():
+    authors = names(9) + [ME_ADS]
+    for n in (1, 3, 8, 10):
+        assert ads.render_authors(authors, max_authors=n) == legacy_render(authors, max_authors=n)
+
+
+def test_matcher_is_accent_and_case_insensitive():
+    matcher = ads.AuthorMatcher()
+    assert matcher("VILLASENOR, J.")
+    assert matcher("Jaime Villaseñor")
+    assert not matcher("Villas, J.")
@@ -0,0 +1,58 @@
+# The on-disk ADS response cache and which runs open it.
+import os
+import sys
+
+import pytest
+
+import update_ads_pubs as ads
+from ads_fakes import ME_ADS, doc
+
+
+@pytest.fixture
+def run_main(tmp_path, monkeypatch):
+    """Run main() with the given arguments from inside tmp_path, restoring the globals it sets."""
+    monkeypatch.chdir(tmp_path)
+    for name in ("TRANSPORT", "TAG_RULES", "CONCURRENCY"):
+        monkeypatch.setattr(ads, name, getattr(ads, name))
+
+    def run(*argv, token=""):
+        monkeypatch.setattr(ads, "TOKEN", token)
+        monkeypatch.setattr(sys, "argv", ["update_ads_pubs.py", *argv])
+        ads.main()
+    return run
+
+
+def test_cache_round_trip_and_refresh(tmp_path):
+    cache = ads.ResponseCache(str(tmp_path))
+    key = ads.ResponseCache.make_key("GET", "search/query", {"q": "x"})
+    cache.put(key, "search", {"docs": [1]})
+    assert cache.get(key, "search") == {"docs": [1]}
+    assert ads.ResponseCache(str(tmp_path), refresh=True).get(key, "search") is None
+
+
+def test_uncached_endpoints_are_not_stored(tmp_path, monkeypatch):
+    monkeypatch.setitem(ads.CACHE_TTLS, "biblib", 0)
+    cache = ads.ResponseCache(str(tmp_path))
+    key = ads.ResponseCache.make_key("GET", "biblib/libraries")
+    cache.put(key, "biblib", {"libraries": []})
+    assert cache.get(key, "biblib") is None
+
+
+def test_offline_modes_do_not_create_the_cache(tmp_path, run_main):
+    ads.write_publications("papers_all.yml", ads.map_docs([doc("2024ApJ...900...12V", [ME_ADS])], {}))
+    run_main("Lib", "papers_all.yml", "--search-index-only", "--search-index", "search")
+    assert os.path.exists(tmp_path / "search" / "meta.json")
+    assert not os.path.exists(tmp_path / ads.DEFAULT_CACHE_DIR)
+
+    ads.write_snapshot(ads.snapshot_file(ads.DEFAULT_CACHE_DIR, "Lib"), [doc("2024ApJ...900...12V", [ME_ADS])], {})
+    run_main("Lib", "papers_all.yml", "--rerender")
+    assert "responses.sqlite3" not in os.listdir(tmp_path / ads.DEFAULT_CACHE_DIR)
+    assert ads.CACHE is None
+
+
+def test_networked_runs_use_the_cache(tmp_path, run_main, monkeypatch):
+    ads.write_publications("papers_all.yml", ads.map_docs([doc("2024ApJ...900...12V", [ME_ADS])], {}))
+    monkeypatch.setattr(ads, "fetch_metrics", lambda bibs: {})
+    run_main("Lib", "papers_all.yml", "--metrics-only", "--metrics", "metrics.yml", token="x")
+    assert ads.CACHE is not None
+    assert os.path.exists(tmp_path / ads.DEFAULT_CACHE_DIR / "responses.sqlite3")
@@ -0,0 +1,43 @@
+# The opt-in compact publications format (--compact).
+import os
+
+import update_ads_pubs as ads
+from ads_fakes import ME_ADS, doc, names
+
+
+def mapped_library():
+    collaboration = names(40, "Member")
+    return ads.sort_mapped(ads.map_docs([
+        doc("2024ApJ...900...12V", [ME_ADS] + names(3)),
+        doc("2023ApJ...890....1S", collaboration + [ME_ADS], year="2023", citations=40),
+        doc("2023ApJ...891....2S", collaboration[:30] + [ME_ADS] + collaboration[30:], year="2023"),
+        doc("2025arXiv250100001V", names(2) + [ME_ADS], year="2025", refereed=False),
+        doc("2022ApJ...880....5N", [], year="2022", citations=0),
+    ], {}))
+
+
+def test_compact_round_trip(tmp_path):
+    mapped = mapped_library()
+    path = str(tmp_path / "papers_all.yml")
+    ads.write_publications(path, mapped, compact=True)
+
+    raw = ads.read_yaml_list(path)
+    assert all(not set(ads.COMPACT_DROP) & set(p) for p in raw)
+    assert all("authors_short_html" in p for p in raw)
+    table = ads.read_yaml(ads.compact_authors_path(path))
+    assert len(table["names"]) == len(table["display"]) == len({a for m in mapped for a in m["authors"]})
+    assert [table["names"][i] for i in table["me"]] == [ME_ADS]
+    assert ads.read_publications(path) == mapped
+
+    full = str(tmp_path / "full.yml")
+    ads.write_publications(full, mapped)
+    assert ads.read_publications(full) == mapped
+
+
+def test_compact_output_is_smaller(tmp_path):
+    mapped = mapped_library()
+    full, compact = str(tmp_path / "full.yml"), str(tmp_path / "compact.yml")
+    ads.write_publications(full, mapped)
+    ads.write_publications(compact, mapped, compact=True)
+    compact_size = os.path.getsize(compact) + os.path.getsize(ads.compact_authors_path(compact))
+    assert compact_size < 0.6 * os.path.getsize(full)
@@ -0,0 +1,111 @@
+# LibraryDaemon tiers against stubbed ADS fetches.
+import argparse
+
+import pytest
+
+import update_ads_pubs as ads
+from ads_fakes import ME_ADS, doc
+
+ARXIV = "2024arXiv240101234V"
+JOURNAL = "2024ApJ...900...12V"
+OLD = "2015ApJ...800....1V"
+
+
+class FakeADS:
+    """Library listing, metadata and citation counts the daemon sees."""
+
+    def __init__(self, library, docs):
+        self.library = list(library)
+        self.docs = {d["bibcode"]: d for d in docs}
+        self.fail_listing = None
+
+    def bibcodes(self, library_id):
+        if self.fail_listing:
+            raise self.fail_listing
+        return list(self.library)
+
+    def fetch(self, bibcodes):
+        by_code = ads.index_docs(list(self.docs.values()))
+        found = {by_code[b]["bibcode"]: by_code[b] for b in bibcodes if b in by_code}
+        return list(found.values()), {}
+
+    def citations(self, bibcodes):
+        return {b: self.docs[b]["citation_count"] for b in bibcodes if b in self.docs}
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    fake = FakeADS([ARXIV, OLD], [doc(ARXIV, [ME_ADS], refereed=False), doc(OLD, [ME_ADS], year="2015")])
+    monkeypatch.setattr(ads, "get_bibcodes_for_library", fake.bibcodes)
+    monkeypatch.setattr(ads, "fetch_docs_and_months", fake.fetch)
+    monkeypatch.setattr(ads, "fetch_citation_counts", fake.citations)
+    return fake
+
+
+def make_daemon(tmp_path):
+    args = argparse.Namespace(
+        out_all=str(tmp_path / "papers_all.yml"), metrics=None, compact=False, shards=None,
+        search_index=None, cache_dir=str(tmp_path / "cache"), local_metrics=False, delta_year=2024,
+        library_name="TEST", history_dir=None,
+    )
+    d = ads.LibraryDaemon(args, "lib")
+    d.load()
+    return d
+
+
+@pytest.fixture
+def daemon(fake, tmp_path):
+    return make_daemon(tmp_path)
+
+
+def test_recent_tier_adds_removes_and_refreshes_citations(daemon, fake):
+    fake.docs["2025ApJ...910....3V"] = doc("2025ApJ...910....3V", [ME_ADS], year="2025")
+    fake.library = [ARXIV, "2025ApJ...910....3V"]
+    fake.docs[ARXIV]["citation_count"] = 9
+    assert daemon.refresh_recent() is True
+    assert set(daemon.papers) == {ARXIV, "2025ApJ...910....3V"}
+    assert daemon.papers[ARXIV]["citations"] == 9
+    assert daemon.refresh_recent() is False
+
+
+def test_promoted_preprint_replaces_its_arxiv_entry(daemon, fake):
+    del fake.docs[ARXIV]
+    fake.docs[JOURNAL] = doc(JOURNAL, [ME_ADS], aliases=[ARXIV])
+    assert daemon.refresh_preprints() is True
+    assert set(daemon.papers) == {JOURNAL, OLD}
+    assert daemon.papers[JOURNAL]["refereed"]
+
+    # the library still lists the arXiv bibcode: no flip-flopping between tiers
+    assert daemon.refresh_recent() is False
+    assert set(daemon.papers) == {JOURNAL, OLD}
+    daemon.dirty = True
+    daemon.flush()
+    assert [m["bibcode"] for m in ads.read_publications(daemon.out_all)] == [JOURNAL, OLD]
+
+
+def test_restarted_daemon_keeps_promoted_entry(daemon, fake, tmp_path):
+    del fake.docs[ARXIV]
+    fake.docs[JOURNAL] = doc(JOURNAL, [ME_ADS], aliases=[ARXIV])
+    daemon.refresh_preprints()
+    daemon.dirty = True
+    daemon.flush()
+
+    restarted = make_daemon(tmp_path)
+    restarted.refresh_recent()
+    assert set(restarted.papers) == {JOURNAL, OLD}
+
+
+def test_listing_failure_is_retried_next_tick(daemon, fake, monkeypatch):
+    fake.fail_listing = SystemExit("503 Server Error: Service Unavailable")
+
+    class Stop(Exception):
+        pass
+
+    def sleep(seconds):
+        raise Stop
+
+    monkeypatch.setattr(daemon, "load", lambda: None)
+    monkeypatch.setattr(ads.time, "sleep", sleep)
+    with pytest.raises(Stop):
+        daemon.run()
+    assert daemon.next_due["recent"] <= ads.time.time() + ads.DAEMON_RETRY
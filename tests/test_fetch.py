@@ -0,0 +1,78 @@
+# Metadata fetching: /search/bigquery with the /search/query fallback, stubbed at ads_json.
+import pytest
+import requests
+
+import update_ads_pubs as ads
+
+
+def http_error(status):
+    r = requests.Response()
+    r.status_code = status
+    return requests.HTTPError(f"{status} error", response=r)
+
+
+class FakeSearch:
+    """Answers ads_json for both search endpoints; bigquery can be made to fail."""
+
+    def __init__(self, bigquery_status=None, page=2):
+        self.bigquery_status = bigquery_status
+        self.page = page
+        self.calls = []
+
+    def __call__(self, method, endpoint, params=None, data=None, headers=None, **kwargs):
+        self.calls.append(endpoint)
+        if endpoint == "search/bigquery":
+            if self.bigquery_status:
+                raise http_error(self.bigquery_status)
+            bibs = data.split("\n")[1:]
+            start = params["start"]
+            docs = [{"bibcode": b} for b in bibs[start:start + self.page]]
+            return {"response": {"numFound": len(bibs), "docs": docs}}
+        bibs = [term.split('"')[1] for term in params["q"].split(" OR ")]
+        return {"response": {"docs": [{"bibcode": b} for b in bibs]}}
+
+
+BIBS = [f"2024ApJ...{n:03d}....1V" for n in range(5)]
+
+
+@pytest.fixture(autouse=True)
+def bigquery_enabled(monkeypatch):
+    monkeypatch.setattr(ads, "BIGQUERY_OK", True)
+    monkeypatch.setattr(ads, "CONCURRENCY", 1)
+
+
+def test_bigquery_pages_through_results(monkeypatch):
+    fake = FakeSearch(page=2)
+    monkeypatch.setattr(ads, "ads_json", fake)
+    docs = ads.fetch_metadata_for_bibcodes(BIBS)
+    assert [d["bibcode"] for d in docs] == BIBS
+    assert fake.calls == ["search/bigquery"] * 3
+
+
+@pytest.mark.parametrize("status", ads.BIGQUERY_UNSUPPORTED)
+def test_unsupported_bigquery_falls_back_for_the_rest_of_the_run(monkeypatch, status):
+    fake = FakeSearch(bigquery_status=status)
+    monkeypatch.setattr(ads, "ads_json", fake)
+    monkeypatch.setattr(ads, "BIGQUERY_CHUNK", 2)
+    docs = ads.fetch_metadata_for_bibcodes(BIBS)
+    assert [d["bibcode"] for d in docs] == BIBS
+    assert ads.BIGQUERY_OK is False
+    assert fake.calls.count("search/bigquery") == 1
+
+
+def test_transient_bigquery_failure_only_falls_back_for_that_chunk(monkeypatch):
+    fake = FakeSearch(bigquery_status=503)
+    monkeypatch.setattr(ads, "ads_json", fake)
+    monkeypatch.setattr(ads, "BIGQUERY_CHUNK", 2)
+    docs = ads.fetch_metadata_for_bibcodes(BIBS)
+    assert [d["bibcode"] for d in docs] == BIBS
+    assert ads.BIGQUERY_OK is True
+    assert fake.calls.count("search/bigquery") == 3
+
+
+def test_other_errors_are_not_swallowed(monkeypatch):
+    def boom(*args, **kwargs):
+        raise requests.ConnectionError("down")
+    monkeypatch.setattr(ads, "ads_json", boom)
+    with pytest.raises(requests.ConnectionError):
+        ads.fetch_metadata_for_bibcodes(BIBS)
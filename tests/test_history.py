@@ -0,0 +1,53 @@
+# The append-only metrics history (--history-dir) and its offline queries.
+import argparse
+
+import update_ads_pubs as ads
+
+
+def test_history_replay(tmp_path):
+    path = str(tmp_path / "jiv.jsonl")
+    history = ads.MetricsHistory(path)
+    days = [
+        ("2024-01-01", {"A": 1, "B": 5}),
+        ("2024-06-01", {"A": 4, "B": 5, "C": 2}),
+        ("2025-01-01", {"A": 10, "C": 3}),               # B left the library
+    ]
+    for date, citations in days:
+        metrics = ads.headline_metrics([{"citations": c} for c in citations.values()])
+        assert history.append(date, citations, metrics) is True
+    assert history.append("2025-02-01", days[-1][1], metrics) is False
+
+    replayed = ads.MetricsHistory(path)
+    assert len(replayed.lines) == 3
+    for date, citations in days:
+        counts = replayed.replay(until=date)
+        assert {b: counts[i] for i, b in enumerate(replayed.bibcodes) if counts[i]} == citations
+    assert replayed.gained_since("2024-01-01") == {"A": 9, "B": -5, "C": 3}
+    assert replayed.window("2024-01-01", "2025-01-01")["total_citations"] == [6, 13, 7]
+    assert replayed.metrics_at("2023-12-31") == {}
+
+
+def test_headline_metrics_are_local():
+    mapped = [{"citations": c} for c in (10, 4, 3, 1, 0)]
+    assert ads.headline_metrics(mapped) == {
+        "total_papers": 5, "total_citations": 18, "h_index": 3, "g_index": 4,
+    }
+
+
+def test_history_before_the_first_snapshot_has_no_baseline(tmp_path, capsys):
+    history = ads.MetricsHistory(str(tmp_path / "test.jsonl"))
+    history.append("2024-01-01", {"A": 100, "B": 50}, {"total_citations": 150})
+    assert history.gained_since("2000-01-01") == {}
+    assert history.window("2000-01-01", "2024-06-01")["total_citations"] == [150, 150, 0]
+
+    history.append("2024-02-01", {"A": 103, "B": 50}, {"total_citations": 153})
+    assert history.gained_since("2000-01-01") == {"A": 3}
+    assert history.baseline("2000-01-01") == "2024-01-01"
+    assert history.baseline("2024-01-15") == "2024-01-15"
+
+    args = argparse.Namespace(history_dir=str(tmp_path), library_name="test", history_since="2000-01-01",
+                              history_window=None, history_growth=None, history_top=10)
+    ads.print_history_report(args)
+    out = capsys.readouterr().out
+    assert "No snapshot before 2024-01-01" in out
+    assert "Citations gained since 2024-01-01: 3" in out
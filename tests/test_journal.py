@@ -0,0 +1,54 @@
+# Checkpointed, resumable runs (--run-dir / --resume).
+import os
+
+import pytest
+
+import update_ads_pubs as ads
+
+
+def test_journal_resume_replays_finished_chunks(tmp_path, monkeypatch):
+    run_dir = str(tmp_path / "run")
+    calls = []
+
+    @ads.checkpointed("demo")
+    def fetch(chunk):
+        calls.append(chunk)
+        if chunk == "boom":
+            raise RuntimeError("network down")
+        return {"chunk": chunk}
+
+    monkeypatch.setattr(ads, "JOURNAL", ads.RunJournal(run_dir))
+    assert fetch("a") == {"chunk": "a"}
+    with pytest.raises(RuntimeError):
+        fetch("boom")
+
+    monkeypatch.setattr(ads, "JOURNAL", ads.RunJournal(run_dir, resume=True))
+    assert ads.JOURNAL.summary() == "1 demo"
+    assert fetch("a") == {"chunk": "a"}
+    assert fetch("b") == {"chunk": "b"}
+    assert calls == ["a", "boom", "b"]
+
+    ads.JOURNAL.finish()
+    assert not os.path.exists(run_dir)
+
+
+def test_journal_fresh_run_discards_old_checkpoints(tmp_path):
+    run_dir = str(tmp_path / "run")
+    ads.RunJournal(run_dir).put("demo", "k", 1)
+    assert ads.RunJournal(run_dir).get("demo", "k") is None
+
+
+def test_journal_refuses_foreign_directory(tmp_path):
+    (tmp_path / "notes.txt").write_text("keep me")
+    with pytest.raises(SystemExit):
+        ads.RunJournal(str(tmp_path))
+    assert (tmp_path / "notes.txt").exists()
+
+
+def test_journal_survives_a_torn_last_line(tmp_path):
+    run_dir = str(tmp_path / "run")
+    journal = ads.RunJournal(run_dir)
+    journal.put("demo", "a", 1)
+    with open(os.path.join(run_dir, "demo.jsonl"), "a", encoding="utf-8") as f:
+        f.write('{"b": 2')                              # interrupted mid-write
+    assert ads.RunJournal(run_dir, resume=True).entries["demo"] == {"a": 1}
@@ -0,0 +1,54 @@
+# The change manifest (--manifest) and no-op writes that let sync_ads_pubs.sh skip rebuilds.
+import json
+import os
+
+import update_ads_pubs as ads
+from ads_fakes import ME_ADS, doc
+
+
+def test_unchanged_write_is_a_noop(tmp_path, monkeypatch):
+    manifest = ads.Manifest()
+    monkeypatch.setattr(ads, "MANIFEST", manifest)
+    path = str(tmp_path / "out.yml")
+    items = [{"bibcode": "2024ApJ...900...12V", "citations": 3}]
+
+    assert ads.write_yaml(path, items) is True
+    os.utime(path, (1, 1))
+    assert ads.write_yaml(path, items) is False
+    assert os.path.getmtime(path) == 1
+    assert manifest.outputs[path]["changed"] is False
+
+    manifest.write(str(tmp_path / "manifest.json"))
+    with open(tmp_path / "manifest.json", encoding="utf-8") as f:
+        assert json.load(f)["changed"] is False
+
+    items[0]["citations"] = 4
+    assert ads.write_yaml(path, items) is True
+    assert manifest.outputs[path]["changed"] is True
+
+
+def test_noop_refresh_on_a_fresh_clone(tmp_path, monkeypatch):
+    mapped = ads.map_docs([doc("2024ApJ...900...12V", [ME_ADS]), doc("2023ApJ...890....1S", [ME_ADS], year="2023")], {})
+    out_all = str(tmp_path / "papers_all.yml")
+    ads.write_publications(out_all, mapped)              # the committed state
+
+    manifest = ads.Manifest()
+    monkeypatch.setattr(ads, "MANIFEST", manifest)
+    ads.write_publications(out_all, mapped)
+    ads.write_search_index(str(tmp_path / "search"), mapped)    # gitignored, absent in a fresh clone
+    manifest.write(str(tmp_path / "manifest.json"))
+    with open(tmp_path / "manifest.json", encoding="utf-8") as f:
+        data = json.load(f)
+    assert data["changed"] is False
+    assert data["publications"][out_all] == {"added": [], "removed": [], "citations": {}}
+
+
+def test_citation_change_is_reported(tmp_path, monkeypatch):
+    out_all = str(tmp_path / "papers_all.yml")
+    ads.write_publications(out_all, ads.map_docs([doc("2024ApJ...900...12V", [ME_ADS])], {}))
+
+    manifest = ads.Manifest()
+    monkeypatch.setattr(ads, "MANIFEST", manifest)
+    ads.write_publications(out_all, ads.map_docs([doc("2024ApJ...900...12V", [ME_ADS], citations=5)], {}))
+    assert manifest.outputs[out_all]["changed"] is True
+    assert manifest.publications[out_all]["citations"] == {"2024ApJ...900...12V": [3, 5]}
@@ -0,0 +1,88 @@
+# --profile / --trace: stage and HTTP spans, the summary table and the Chrome-trace file.
+import json
+
+import pytest
+import requests
+
+import update_ads_pubs as ads
+
+
+class FakeTransport:
+    def __init__(self, status=200):
+        self.status = status
+
+    def request(self, method, path, **kwargs):
+        r = requests.Response()
+        r.status_code = self.status
+        r._content = b'{"response": {"docs": []}}'
+        r.ads_retries = 1
+        if self.status >= 400:
+            raise requests.HTTPError(f"{self.status} error", response=r)
+        return r
+
+
+@pytest.fixture
+def tracer(monkeypatch):
+    tracer = ads.Tracer()
+    monkeypatch.setattr(ads, "TRACER", tracer)
+    monkeypatch.setattr(ads, "transport", lambda: FakeTransport())
+    return tracer
+
+
+def test_traced_stages_and_http_calls_are_recorded(tracer):
+    @ads.traced("fetch")
+    def fetch():
+        return ads.ads_json("GET", "search/query", params={"q": "x"})
+
+    fetch()
+    fetch()
+    stages = [e for e in tracer.events if e["cat"] == "stage"]
+    calls = [e for e in tracer.events if e["cat"] == "http"]
+    assert [e["name"] for e in stages] == ["fetch", "fetch"]
+    assert calls[0]["name"] == "GET /search/query"
+    assert calls[0]["args"] == {"endpoint": "search", "cache": "off", "status": 200,
+                                "bytes": 26, "retries": 1}
+
+    summary = tracer.summary().splitlines()
+    fetch_row = next(line for line in summary if line.startswith("fetch "))
+    assert fetch_row.split()[1] == "2"
+    search_row = next(line for line in summary if line.startswith("search "))
+    assert search_row.split()[1:3] == ["2", "0"]                 # calls, cache hits
+    assert search_row.split()[-2:] == ["2", "0"]                 # retries, errors
+
+
+def test_cache_hits_and_errors_are_counted(tracer, tmp_path, monkeypatch):
+    monkeypatch.setattr(ads, "CACHE", ads.ResponseCache(str(tmp_path / "cache")))
+    ads.ads_json("GET", "metrics", params={"b": 1})
+    ads.ads_json("GET", "metrics", params={"b": 1})
+    monkeypatch.setattr(ads, "transport", lambda: FakeTransport(status=500))
+    with pytest.raises(requests.HTTPError):
+        ads.ads_json("GET", "metrics", params={"b": 2})
+    assert [e["args"]["cache"] for e in tracer.events] == ["miss", "hit", "miss"]
+    assert tracer.events[-1]["args"]["status"] == 500
+    assert tracer.events[-1]["args"]["error"] == "HTTPError"
+    row = next(line for line in tracer.summary().splitlines() if line.startswith("metrics "))
+    assert row.split()[1:3] == ["3", "1"]
+    assert row.split()[-1] == "1"
+
+
+def test_chrome_trace_file(tracer, tmp_path):
+    with ads.span("sync"):
+        ads.ads_json("GET", "search/query")
+    path = tmp_path / "trace.json"
+    tracer.write_chrome_trace(str(path))
+    with open(path, encoding="utf-8") as f:
+        trace = json.load(f)
+    complete = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    meta = [e for e in trace["traceEvents"] if e["ph"] == "M"]
+    assert {e["name"] for e in complete} == {"sync", "GET /search/query"}
+    sync = next(e for e in complete if e["name"] == "sync")
+    call = next(e for e in complete if e["cat"] == "http")
+    assert sync["ts"] <= call["ts"] and call["ts"] + call["dur"] <= sync["ts"] + sync["dur"] + 1
+    assert meta == [{"name": "thread_name", "ph": "M", "pid": 1, "tid": 1, "args": {"name": "main"}}]
+
+
+def test_without_a_tracer_spans_are_free(monkeypatch):
+    monkeypatch.setattr(ads, "transport", lambda: FakeTransport())
+    assert ads.TRACER is None
+    assert ads.ads_json("GET", "search/query") == {"response": {"docs": []}}
@@ -0,0 +1,41 @@
+# The records sidecar that --metrics-only, --incremental and the daemon load instead of the YAML.
+import os
+
+import update_ads_pubs as ads
+from ads_fakes import ME_ADS, doc, names
+
+
+def write_library(tmp_path, docs):
+    out_all = str(tmp_path / "papers_all.yml")
+    cache_dir = str(tmp_path / "cache")
+    mapped = ads.sort_mapped(ads.map_docs(docs, {}))
+    ads.write_publications(out_all, mapped)
+    assert ads.write_records(cache_dir, "Lib", mapped, ads.publications_signature(out_all)) == len(mapped)
+    return out_all, cache_dir, mapped
+
+
+DOCS = [doc("2024ApJ...900...12V", [ME_ADS] + names(2)), doc("2023ApJ...890....1S", [ME_ADS], year="2023")]
+
+
+def test_current_records_are_loaded(tmp_path, monkeypatch):
+    out_all, cache_dir, mapped = write_library(tmp_path, DOCS)
+    monkeypatch.setattr(ads, "read_publications", lambda *a: [])
+    assert ads.load_publications(out_all, None, cache_dir, "Lib") == mapped
+
+
+def test_stale_records_fall_back_to_the_yaml(tmp_path):
+    out_all, cache_dir, mapped = write_library(tmp_path, DOCS)
+    edited = mapped[:1]
+    ads.write_publications(out_all, edited)                          # e.g. a hand edit or another tool
+    assert ads.read_records(cache_dir, "Lib", ads.publications_signature(out_all)) is None
+    assert ads.load_publications(out_all, None, cache_dir, "Lib") == edited
+
+
+def test_missing_or_foreign_records_fall_back_to_the_yaml(tmp_path):
+    out_all, cache_dir, mapped = write_library(tmp_path, DOCS)
+    path = ads.records_file(cache_dir, "Lib")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"bibcode": "2024ApJ...900...12V"}\n')                 # no header line
+    assert ads.load_publications(out_all, None, cache_dir, "Lib") == mapped
+    os.unlink(path)
+    assert ads.load_publications(out_all, None, cache_dir, "Other") == mapped
@@ -0,0 +1,48 @@
+# The sharded client-side search index (--search-index) read by assets/js/pub-search.js.
+import json
+import os
+
+import pytest
+
+import update_ads_pubs as ads
+from ads_fakes import ME_ADS, doc, names
+
+
+@pytest.mark.parametrize("term, key", [
+    ("villasenor", "vi"),
+    ("0.5", "05"),
+    ("2401.01234", "24"),
+    ("2024", "20"),
+])
+def test_search_shard_key(term, key):
+    assert ads.search_shard_key(term) == key
+
+
+def test_search_index_terms_live_in_their_shard(tmp_path):
+    mapped = ads.sort_mapped(ads.map_docs([
+        doc("2024ApJ...900...12V", [ME_ADS, "Smith, A."], title="A 0.5 solar mass companion"),
+        doc("2023ApJ...890....1S", names(4), year="2023", title="Binaries in 30 Doradus"),
+    ], {}))
+    folder = str(tmp_path / "search")
+    assert ads.write_search_index(folder, mapped) == 2
+
+    with open(os.path.join(folder, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    files = sorted(name[:-5] for name in os.listdir(os.path.join(folder, "terms")))
+    assert meta["shards"] == files
+    assert all("." not in key for key in files)
+    for key in files:
+        with open(os.path.join(folder, "terms", f"{key}.json"), encoding="utf-8") as f:
+            for term in json.load(f):
+                assert ads.search_shard_key(term) == key
+    with open(os.path.join(folder, "terms", "05.json"), encoding="utf-8") as f:
+        assert json.load(f)["0.5"] == [0]
+
+
+def test_search_index_prunes_stale_shards(tmp_path):
+    folder = str(tmp_path / "search")
+    first = ads.map_docs([doc("2024ApJ...900...12V", [ME_ADS], title="Quasars")], {})
+    ads.write_search_index(folder, first)
+    assert os.path.exists(os.path.join(folder, "terms", "qu.json"))
+    ads.write_search_index(folder, ads.map_docs([doc("2024ApJ...900...12V", [ME_ADS], title="Binaries")], {}))
+    assert not os.path.exists(os.path.join(folder, "terms", "qu.json"))
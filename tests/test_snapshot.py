@@ -0,0 +1,75 @@
+# Raw-doc snapshots and --rerender, which rebuilds the outputs from them without ADS.
+import os
+import sys
+
+import pytest
+import requests
+
+import update_ads_pubs as ads
+from ads_fakes import ME_ADS, doc, names
+
+DOCS = [
+    doc("2024ApJ...900...12V", [ME_ADS] + names(2), citations=5),
+    doc("2023ApJ...890....1S", names(30) + [ME_ADS], year="2023", citations=40),
+    doc("2025arXiv250100001V", [ME_ADS], year="2025", refereed=False, citations=0),
+]
+MONTHS = {"2024ApJ...900...12V": ads.month_from_pubdate("2024-03-00"),
+          "2023ApJ...890....1S": ads.month_from_pubdate("2023-11-00")}
+
+
+def rerendered(path):
+    return [m for chunk in ads.rerender_chunks(path) for m in chunk]
+
+
+def test_rerender_matches_a_fresh_mapping(tmp_path, monkeypatch):
+    monkeypatch.setattr(ads, "BIGQUERY_CHUNK", 2)                 # more than one chunk
+    path = str(tmp_path / "snapshot.jsonl.gz")
+    ads.write_snapshot(path, DOCS, MONTHS)
+    assert rerendered(path) == ads.map_docs(DOCS, MONTHS)
+
+
+def test_update_snapshot_keeps_refreshes_and_adds(tmp_path):
+    path = str(tmp_path / "snapshot.jsonl.gz")
+    ads.write_snapshot(path, DOCS, MONTHS)
+    added = doc("2026ApJ...910....3V", [ME_ADS], year="2026")
+    promoted = doc("2025arXiv250100001V", [ME_ADS], year="2025", refereed=False, citations=2)
+    keep = {"2024ApJ...900...12V", "2025arXiv250100001V"}           # 2023ApJ...890....1S left the library
+    ads.update_snapshot(path, keep, {"2024ApJ...900...12V": 9}, [added, promoted], {})
+
+    entries = list(ads.iter_snapshot(path))
+    assert [d["bibcode"] for d, _ in entries] == ["2024ApJ...900...12V", "2026ApJ...910....3V",
+                                                  "2025arXiv250100001V"]
+    assert entries[0] == (dict(DOCS[0], citation_count=9), MONTHS["2024ApJ...900...12V"])
+    assert entries[2][0]["citation_count"] == 2
+
+
+def test_rerender_cli_writes_the_outputs_offline(tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    ads.write_snapshot(ads.snapshot_file(cache_dir, "Lib"), DOCS, MONTHS)
+    out_all = str(tmp_path / "papers_all.yml")
+    out_sdss = str(tmp_path / "papers_sdss.yml")
+
+    def no_network(*args, **kwargs):
+        raise AssertionError("--rerender must not call ADS")
+    monkeypatch.setattr(requests.Session, "request", no_network)
+    monkeypatch.setattr(ads, "TOKEN", "")
+    for name in ("TRANSPORT", "TAG_RULES", "CONCURRENCY"):
+        monkeypatch.setattr(ads, name, getattr(ads, name))
+    monkeypatch.setattr(sys, "argv", ["update_ads_pubs.py", "Lib", out_all, "--rerender",
+                                      "--sdss", out_sdss, "--cache-dir", cache_dir])
+    ads.main()
+
+    assert ads.read_publications(out_all) == ads.sort_mapped(ads.map_docs(DOCS, MONTHS))
+    assert os.path.exists(ads.views_path(out_all))
+    assert os.path.exists(out_sdss)
+
+
+def test_rerender_without_a_snapshot_fails(tmp_path, monkeypatch):
+    monkeypatch.setattr(ads, "TOKEN", "")
+    for name in ("TRANSPORT", "TAG_RULES", "CONCURRENCY"):
+        monkeypatch.setattr(ads, name, getattr(ads, name))
+    monkeypatch.setattr(sys, "argv", ["update_ads_pubs.py", "Lib", str(tmp_path / "papers_all.yml"),
+                                      "--rerender", "--cache-dir", str(tmp_path / "cache")])
+    with pytest.raises(SystemExit):
+        ads.main()
+    assert not os.path.exists(tmp_path / "papers_all.yml")
@@ -0,0 +1,57 @@
+# Tag rules from scripts/ads_tags.yml-style files.
+import pytest
+import yaml
+
+import update_ads_pubs as ads
+
+
+def load(tmp_path, rules):
+    path = tmp_path / "tags.yml"
+    path.write_text(yaml.safe_dump({"rules": rules}), encoding="utf-8")
+    return ads.TagRules.load(str(path))
+
+
+def paper(title="", pub="", bibcode="2024ApJ...900...12V", authors=()):
+    return {"title": title, "pub": pub, "bibcode": bibcode, "authors": list(authors)}
+
+
+def test_default_rules_cover_every_field():
+    rules = ads.TagRules.load(ads.DEFAULT_TAGS_YML)
+    assert rules(paper("The Algol-type binaries of SDSS-V")) == ["sdssv", "algols"]
+    assert rules(paper("Spectroscopy", pub="Sloan Digital Sky Survey")) == ["sdssv"]
+    assert rules(paper("BLOeM: B-type binaries")) == ["bbc", "bloem"]
+    assert rules(paper("Nothing to see")) == []
+
+
+def test_keywords_are_accent_and_case_insensitive(tmp_path):
+    rules = load(tmp_path, [{"tag": "mw", "keywords": ["Vía Láctea"]}, {"tag": "team", "authors": ["Müller"]}])
+    assert rules(paper("La VIA LACTEA")) == ["mw"]
+    assert rules(paper("x", authors=["Muller, A."])) == ["team"]
+
+
+def test_keyword_sharing_a_prefix_with_a_longer_one(tmp_path):
+    rules = load(tmp_path, [{"tag": "short", "keywords": ["bin"]}, {"tag": "long", "keywords": ["binaries"]}])
+    assert rules(paper("Massive binaries")) == ["short", "long"]
+
+
+def test_regexes_that_do_not_combine_into_one_pattern(tmp_path):
+    rules = load(tmp_path, [
+        {"tag": "first", "regex": ["(ab)\\1"]},
+        {"tag": "flags", "regex": ["(?i)eclipsing"]},             # global flag, not at the start once spliced
+        {"tag": "again", "regex": ["(cd)\\1"]},
+        {"tag": "code", "bibcode": ["^20(2[0-9])ApJ"]},
+    ])
+    assert rules(paper("abab and cdcd")) == ["first", "again", "code"]
+    assert rules(paper("An eclipsing system", bibcode="2019MNRAS")) == ["flags"]
+    assert rules(paper("ab cd", bibcode="2019MNRAS")) == []
+
+
+def test_bad_regex_names_its_tag(tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        load(tmp_path, [{"tag": "broken", "regex": ["(unclosed"]}])
+    assert "broken" in capsys.readouterr().err
+
+
+def test_rule_without_tag_is_rejected(tmp_path):
+    with pytest.raises(SystemExit):
+        load(tmp_path, [{"keywords": ["x"]}])
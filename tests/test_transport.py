@@ -0,0 +1,115 @@
+# Rate limiting, the shared transport and the chunk scheduler; no ADS access needed.
+import threading
+import time
+
+import pytest
+import requests
+
+import update_ads_pubs as ads
+
+NOW = 1_700_000_000.0
+
+
+def limited(remaining, reset_in):
+    return {"X-RateLimit-Remaining": str(remaining), "X-RateLimit-Reset": str(int(NOW + reset_in))}
+
+
+def test_rate_limiter_plenty_of_quota_does_not_wait():
+    limiter = ads.RateLimiter()
+    assert limiter.delay("search", NOW) == 0.0
+    limiter.update("search", limited(4000, 3600))
+    assert limiter.delay("search", NOW) == 0.0
+
+
+def test_rate_limiter_is_per_endpoint():
+    limiter = ads.RateLimiter()
+    limiter.update("metrics", limited(3, 30))
+    assert limiter.delay("metrics", NOW) == pytest.approx(30, abs=1)
+    assert limiter.delay("search", NOW) == 0.0
+    assert limiter.delay("biblib", NOW) == 0.0
+
+
+def test_rate_limiter_caps_pacing_over_a_daily_window():
+    limiter = ads.RateLimiter(max_delay=2.0)
+    limiter.update("search", limited(99, 20 * 3600))      # would be ~727 s per call if paced evenly
+    assert limiter.delay("search", NOW) == 2.0
+    limiter.update("search", limited(50, 10))
+    assert limiter.delay("search", NOW) == pytest.approx(10 / 50, abs=0.05)
+
+
+def test_rate_limiter_exhausted_waits_only_for_a_near_reset():
+    limiter = ads.RateLimiter(max_wait=60.0)
+    limiter.update("export", limited(2, 20))
+    assert limiter.delay("export", NOW) == pytest.approx(20, abs=1)
+    limiter.update("export", limited(2, 20 * 3600))
+    assert limiter.delay("export", NOW) == 0.0
+
+
+def test_rate_limiter_counts_calls_until_the_next_update():
+    limiter = ads.RateLimiter(reserve=5, low_water=100)
+    limiter.update("search", limited(100, 50))
+    assert limiter.delay("search", NOW) == 0.0             # 100 left
+    assert limiter.delay("search", NOW) > 0.0              # 99 left: below low water
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def request(self, method, url, timeout=None, **kwargs):
+        self.calls.append(url)
+        status, headers = self.responses.pop(0)
+        r = requests.Response()
+        r.status_code = status
+        r.headers.update(headers)
+        r._content = b"{}"
+        r.url = url
+        return r
+
+
+def test_transport_feeds_the_limiter_per_endpoint(monkeypatch):
+    limiter = ads.RateLimiter()
+    monkeypatch.setattr(ads, "RATE_LIMIT", limiter)
+    t = ads.AdsTransport(retries=0)
+    t.session = FakeSession([(200, {"X-RateLimit-Remaining": "7", "X-RateLimit-Reset": "0"})])
+    t.request("GET", "metrics")
+    assert limiter.state["metrics"][0] == 7
+    assert "search" not in limiter.state
+
+
+def test_transport_retries_then_raises(monkeypatch):
+    monkeypatch.setattr(ads, "RATE_LIMIT", ads.RateLimiter())
+    monkeypatch.setattr(ads.time, "sleep", lambda s: None)
+    t = ads.AdsTransport(retries=2)
+    t.session = FakeSession([(503, {}), (503, {}), (503, {})])
+    with pytest.raises(requests.HTTPError):
+        t.request("GET", "search/query")
+    assert len(t.session.calls) == 3
+    assert t.stats["search"]["retries"] == 2
+
+
+def test_run_chunks_keeps_order_and_runs_concurrently(monkeypatch):
+    monkeypatch.setattr(ads, "CONCURRENCY", 4)
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def work(chunk):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02 * (len(chunk) % 3))                # finish out of order
+        with lock:
+            active[0] -= 1
+        return sum(chunk)
+
+    chunks = [list(range(n)) for n in range(1, 13)]
+    assert ads.run_chunks(work, chunks) == [sum(c) for c in chunks]
+    assert peak[0] > 1
+
+
+def test_run_chunks_sequential_without_concurrency(monkeypatch):
+    monkeypatch.setattr(ads, "CONCURRENCY", 1)
+    seen = []
+    assert ads.run_chunks(lambda c: seen.append(c) or c * 2, [1, 2, 3]) == [2, 4, 6]
+    assert seen == [1, 2, 3]